@@ -0,0 +1,58 @@
+"""add composite indexes for hot access paths
+
+Revision ID: e29f8817d68b
+Revises: 5ce1d4289bce
+Create Date: 2026-10-17 10:15:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e29f8817d68b'
+down_revision: Union[str, None] = '5ce1d4289bce'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_trip_locations_trip_recorded', 'trip_locations', ['trip_id', 'recorded_at', 'id']),
+    ('ix_trip_locations_trip_user_recorded', 'trip_locations', ['trip_id', 'user_id', 'recorded_at']),
+    ('ix_trip_participants_trip_user', 'trip_participants', ['trip_id', 'user_id']),
+    ('ix_trip_participants_user_trip', 'trip_participants', ['user_id', 'trip_id']),
+    ('ix_trips_map_active_started', 'trips', ['map_id', 'is_active', 'started_at']),
+    ('ix_notifications_user_created', 'notifications', ['user_id', 'created_at']),
+    ('ix_chat_messages_map_created', 'chat_messages', ['map_id', 'created_at']),
+    ('ix_chat_messages_trip_created', 'chat_messages', ['trip_id', 'created_at']),
+    ('ix_check_ins_place_visited', 'check_ins', ['place_id', 'visited_at']),
+    ('ix_friendships_addressee_status', 'friendships', ['addressee_id', 'status']),
+]
+
+
+def _existing_indexes() -> dict[str, set[str]]:
+    inspector = sa.inspect(op.get_bind())
+    return {
+        table: {index['name'] for index in inspector.get_indexes(table)}
+        for table in inspector.get_table_names()
+    }
+
+
+def upgrade() -> None:
+    existing = _existing_indexes()
+    for name, table, columns in INDEXES:
+        # trip_locations may live in the telemetry database (TELEMETRY_DATABASE_URL);
+        # create_tables may also have created some of these indexes already
+        if table not in existing or name in existing[table]:
+            continue
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    existing = _existing_indexes()
+    for name, table, _ in reversed(INDEXES):
+        if name in existing.get(table, set()):
+            op.drop_index(name, table_name=table)
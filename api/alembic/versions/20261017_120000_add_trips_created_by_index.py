@@ -0,0 +1,45 @@
+"""add trips indexes for the trip history
+
+Revision ID: 7c4a1f9e2b63
+Revises: e29f8817d68b
+Create Date: 2026-10-17 12:00:00.000000+00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4a1f9e2b63'
+down_revision: Union[str, None] = 'e29f8817d68b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, columns)
+INDEXES = [
+    ('ix_trips_created_by_started', ['created_by', 'started_at', 'id']),
+    ('ix_trips_started', ['started_at', 'id']),
+]
+
+
+def _existing_indexes() -> set[str]:
+    inspector = sa.inspect(op.get_bind())
+    return {index['name'] for index in inspector.get_indexes('trips')}
+
+
+def upgrade() -> None:
+    existing = _existing_indexes()
+    for name, columns in INDEXES:
+        # create_tables may have created it already
+        if name not in existing:
+            op.create_index(name, 'trips', columns, unique=False)
+
+
+def downgrade() -> None:
+    existing = _existing_indexes()
+    for name, _ in reversed(INDEXES):
+        if name in existing:
+            op.drop_index(name, table_name='trips')
@@ -5,6 +5,8 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite+aiosqlite:///./vmaps.db"
+    # Optional separate database for trip locations; empty uses database_url
+    telemetry_database_url: str = ""
     
     # JWT
     secret_key: str = "your-super-secret-key-change-in-production"
@@ -19,6 +21,72 @@ class Settings(BaseSettings):
     upload_dir: str = "./uploads"
     max_file_size: int = 5242880  # 5MB
     
+    # Trip locations (write-behind buffer)
+    location_write_behind: bool = True
+    location_flush_rows: int = 200
+    location_flush_interval_ms: int = 500
+    location_buffer_max_rows: int = 10000
+    location_flush_max_attempts: int = 20  # a batch failing with a non-transient error is dropped after this many flushes
+    
+    # Trip locations (ingest filter)
+    location_filter_enabled: bool = True
+    location_filter_min_distance_m: float = 5.0
+    location_filter_min_interval_s: float = 1.0
+    location_filter_keepalive_s: float = 60.0
+    location_filter_max_accuracy_m: float = 100.0  # 0 disables
+    location_filter_smoothing: bool = False
+    location_filter_process_noise_mps: float = 3.0
+    
+    # Active-trip caches (live positions, rosters): LRU bound and TTL backstop
+    trip_cache_size: int = 5000
+    trip_cache_ttl_s: float = 300.0
+    
+    # Trip locations (cold storage of ended trips, see archive_trip_locations.py)
+    location_archive_after_days: int = 30
+    
+    # Trip replay (GET /trips/{id}/replay)
+    trip_replay_max_frames: int = 20000
+    trip_replay_cache_size: int = 32  # ended trips, per (trip, frame_ms)
+    
+    # WebSocket fan-out: location_updated events are coalesced per recipient
+    # and flushed every tick (0 sends each one immediately)
+    ws_location_tick_ms: int = 1000
+    
+    # WebSocket backplane: "local" (single worker) or "sqlite" (several workers on one host)
+    ws_backplane: str = "local"
+    ws_backplane_path: str = "./vmaps_backplane.db"
+    ws_backplane_poll_ms: int = 50
+    ws_backplane_retention_s: int = 60
+    
+    # WebSocket send queues: frames beyond ws_send_queue_size are dropped (location
+    # updates/pings first); sockets saturated for too long are disconnected
+    ws_send_queue_size: int = 256
+    ws_send_timeout_s: float = 5.0
+    ws_slow_consumer_timeout_s: float = 10.0
+    
+    # Friend id cache (broadcast_to_friends, following feed, suggestions)
+    friend_cache_size: int = 10000
+    friend_cache_ttl_s: float = 300.0
+    
+    # Presence: presence_changed is pushed to friends once a state has held for
+    # presence_debounce_s; workers exchange snapshots every presence_sync_s
+    presence_debounce_s: float = 5.0
+    presence_sync_s: float = 30.0
+    
+    # WebSocket reconnect replay: last ws_replay_buffer_size events per user, kept
+    # ws_replay_ttl_s after their last socket closes (0 disables seq/replay)
+    ws_replay_buffer_size: int = 200
+    ws_replay_ttl_s: float = 300.0
+    ws_replay_max_users: int = 10000
+    
+    # Trip proximity events (participant_nearby/separated, geofence_enter/exit)
+    proximity_enabled: bool = True
+    proximity_near_m: float = 50.0
+    proximity_far_m: float = 100.0
+    proximity_geofence_enabled: bool = False
+    proximity_geofence_radius_m: float = 75.0
+    proximity_geofence_exit_m: float = 120.0
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
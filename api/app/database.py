@@ -5,21 +5,47 @@ from app.config import settings
 
 
 # Ajustar URL para async
-database_url = settings.database_url
-if database_url.startswith("postgresql://"):
-    database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-elif database_url.startswith("sqlite://"):
-    database_url = database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+def _async_url(url: str) -> str:
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+database_url = _async_url(settings.database_url)
 
 engine = create_async_engine(
     database_url,
     echo=True,  # Logs SQL (desabilitar em produção)
 )
 
+# Telemetria (TripLocation etc.) pode ir para um banco separado, para que rajadas
+# de localização não disputem o lock de escrita com chat, check-ins e feed
+if settings.telemetry_database_url:
+    telemetry_engine = create_async_engine(
+        _async_url(settings.telemetry_database_url),
+        echo=True,
+    )
+else:
+    telemetry_engine = engine
+
+
+class TelemetryMixin:
+    """Marks append-only telemetry models, stored through telemetry_engine."""
+
+
 async_session = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
+    binds={TelemetryMixin: telemetry_engine},
+)
+
+telemetry_session = async_sessionmaker(
+    telemetry_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
 )
 
 
@@ -40,6 +66,22 @@ async def create_tables():
         # Import models to register them
         from app.models import user, place, map, trip, check_in, friendship, profile, social, user_social, notification, group, map_member
         
+        
+        telemetry_tables = [
+            mapper.local_table for mapper in Base.registry.mappers
+            if issubclass(mapper.class_, TelemetryMixin)
+        ]
+        separate = telemetry_engine is not engine
+        main_tables = [
+            table for table in Base.metadata.sorted_tables
+            if not (separate and table in telemetry_tables)
+        ]
+        
         # Habilitar modo WAL para melhor concorrência em SQLite
         await conn.execute(text("PRAGMA journal_mode=WAL"))
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(Base.metadata.create_all, tables=main_tables)
+    
+    if telemetry_engine is not engine:
+        async with telemetry_engine.begin() as conn:
+            await conn.execute(text("PRAGMA journal_mode=WAL"))
+            await conn.run_sync(Base.metadata.create_all, tables=telemetry_tables)
@@ -15,6 +15,13 @@ logger = logging.getLogger(__name__)
 
 from app.config import settings
 from app.database import create_tables
+from app.utils.location_buffer import location_buffer
+from app.utils.location_filter import location_filter
+from app.utils.proximity import proximity
+from app.utils.friend_cache import friend_ids_cache
+from app.utils.trip_cache import live_positions, roster_cache
+from app.utils.presence import presence
+from app.utils.websockets import manager
 from app.routers import (
     auth_router,
     users_router,
@@ -37,6 +44,9 @@ async def lifespan(app: FastAPI):
     logger.info(f"--- STARTUP: USING DATABASE URL: {settings.database_url} ---")
     await create_tables()
     os.makedirs(settings.upload_dir, exist_ok=True)
+    location_buffer.start()
+    manager.start()
+    presence.start()
     
     # Log de diagnóstico
     allowed_origins = [
@@ -55,6 +65,11 @@ async def lifespan(app: FastAPI):
     logger.info(f">>> API INICIADA | CORS ALLOWED ORIGINS: {allowed_origins}")
     
     yield
+    
+    # Shutdown: drain pending trip locations and coalesced updates
+    await location_buffer.stop()
+    await presence.stop()
+    await manager.stop()
 
 app = FastAPI(
     title="V-Maps API",
@@ -88,6 +103,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Static files (uploads)
@@ -122,6 +138,21 @@ async def cors_check(request: Request):
         "allowed_origins_hint": "capacitor://localhost, http://localhost, https://localhost"
     }
 
+@app.get("/debug/metrics")
+async def metrics():
+    """Métricas internas de ingestão e cache."""
+    return {
+        "location_buffer": location_buffer.stats(),
+        "location_filter": location_filter.stats(),
+        "proximity": proximity.stats(),
+        "websocket": manager.stats(),
+        "websocket_backplane": manager.backplane.stats(),
+        "friend_ids_cache": friend_ids_cache.stats(),
+        "live_positions_cache": live_positions.stats(),
+        "trip_roster_cache": roster_cache.stats(),
+        "presence": presence.stats(),
+    }
+
 # Routers
 app.include_router(auth_router)
 app.include_router(users_router)
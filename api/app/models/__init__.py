@@ -12,7 +12,7 @@ from app.models.friendship import Friendship, FriendshipStatus
 from app.models.group import Group, GroupMember, GroupMap, GroupInvite
 from app.models.social import CheckInLike, CheckInComment, SocialPost, SocialPostLike, SocialPostComment
 from app.models.user_social import FavoritePlace, WishListPlace
-from app.models.trip import Trip, TripParticipant, TripLocation
+from app.models.trip import Trip, TripParticipant, TripLocation, TripStats, TripLocationArchive
 from app.models.avatar import Avatar
 from app.models.notification import Notification
 
@@ -38,6 +38,8 @@ __all__ = [
     "Trip",
     "TripParticipant",
     "TripLocation",
+    "TripStats",
+    "TripLocationArchive",
     "SocialPost",
     "SocialPostLike",
     "SocialPostComment",
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, ForeignKey, Text
+from sqlalchemy import String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
@@ -33,6 +33,11 @@ class ChatMessage(Base):
     content: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
     
+    __table_args__ = (
+        Index("ix_chat_messages_map_created", "map_id", "created_at"),
+        Index("ix_chat_messages_trip_created", "trip_id", "created_at"),
+    )
+    
     # Relationships
     map: Mapped["Map"] = relationship("Map", back_populates="chat_messages")
     trip: Mapped["Trip"] = relationship("Trip")
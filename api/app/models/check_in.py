@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, ForeignKey, Text, Integer, Boolean
+from sqlalchemy import String, DateTime, ForeignKey, Text, Integer, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
@@ -32,6 +32,10 @@ class CheckIn(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
     shared_to_feed: Mapped[bool] = mapped_column(Boolean, default=False)
     
+    __table_args__ = (
+        Index("ix_check_ins_place_visited", "place_id", "visited_at"),
+    )
+    
     # Relationships
     place: Mapped["Place"] = relationship("Place", back_populates="check_ins")
     user: Mapped["User"] = relationship("User", back_populates="check_ins")
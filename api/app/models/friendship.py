@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, ForeignKey, Enum as SQLEnum, UniqueConstraint
+from sqlalchemy import String, DateTime, ForeignKey, Enum as SQLEnum, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 import enum
@@ -56,4 +56,6 @@ class Friendship(Base):
     
     __table_args__ = (
         UniqueConstraint('requester_id', 'addressee_id', name='unique_friendship'),
+        # Incoming requests / friends by addressee (requester_id is covered by unique_friendship)
+        Index('ix_friendships_addressee_status', 'addressee_id', 'status'),
     )
@@ -1,8 +1,8 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import String, DateTime, ForeignKey, Boolean, Float, Text
+from sqlalchemy import String, DateTime, ForeignKey, Boolean, Float, Text, Integer, JSON, LargeBinary, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from app.database import Base
+from app.database import Base, TelemetryMixin
 
 
 class Trip(Base):
@@ -49,6 +49,15 @@ class Trip(Base):
     )
     shared_to_feed: Mapped[bool] = mapped_column(Boolean, default=False)
     
+    __table_args__ = (
+        # Active trips of a map, newest first
+        Index("ix_trips_map_active_started", "map_id", "is_active", "started_at"),
+        # Trip history, newest first: trips created by a user, and all trips walked in
+        # order while probing the participant index
+        Index("ix_trips_created_by_started", "created_by", "started_at", "id"),
+        Index("ix_trips_started", "started_at", "id"),
+    )
+    
     # Relationships
     map: Mapped["Map"] = relationship("Map", back_populates="trips")
     creator: Mapped["User"] = relationship("User", back_populates="trips")
@@ -62,6 +71,12 @@ class Trip(Base):
         back_populates="trip",
         cascade="all, delete-orphan"
     )
+    stats: Mapped["TripStats"] = relationship(
+        "TripStats",
+        back_populates="trip",
+        uselist=False,
+        cascade="all, delete-orphan"
+    )
 
 
 class TripParticipant(Base):
@@ -85,12 +100,17 @@ class TripParticipant(Base):
     joined_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
     status: Mapped[str] = mapped_column(String(20), default="invited")  # invited, accepted, declined, left
     
+    __table_args__ = (
+        Index("ix_trip_participants_trip_user", "trip_id", "user_id"),
+        Index("ix_trip_participants_user_trip", "user_id", "trip_id"),
+    )
+    
     # Relationships
     trip: Mapped["Trip"] = relationship("Trip", back_populates="participants")
     user: Mapped["User"] = relationship("User", back_populates="trip_participations")
 
 
-class TripLocation(Base):
+class TripLocation(TelemetryMixin, Base):
     __tablename__ = "trip_locations"
     
     id: Mapped[str] = mapped_column(
@@ -113,6 +133,58 @@ class TripLocation(Base):
     accuracy: Mapped[float] = mapped_column(Float, default=0.0)
     recorded_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
     
+    __table_args__ = (
+        # Path reads and keyset cursors order by (recorded_at, id) within a trip
+        Index("ix_trip_locations_trip_recorded", "trip_id", "recorded_at", "id"),
+        # Per-participant filters and last positions
+        Index("ix_trip_locations_trip_user_recorded", "trip_id", "user_id", "recorded_at"),
+    )
+    
     # Relationships
     trip: Mapped["Trip"] = relationship("Trip", back_populates="locations")
     user: Mapped["User"] = relationship("User")
+
+
+class TripStats(Base):
+    """Statistics and preview path computed once when a trip ends."""
+    __tablename__ = "trip_stats"
+    
+    trip_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("trips.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    point_count: Mapped[int] = mapped_column(Integer, default=0)
+    duration_seconds: Mapped[float] = mapped_column(Float, default=0.0)
+    total_distance_m: Mapped[float] = mapped_column(Float, default=0.0)
+    max_speed_mps: Mapped[float] = mapped_column(Float, default=0.0)
+    avg_speed_mps: Mapped[float] = mapped_column(Float, default=0.0)
+    min_latitude: Mapped[float] = mapped_column(Float, nullable=True)
+    min_longitude: Mapped[float] = mapped_column(Float, nullable=True)
+    max_latitude: Mapped[float] = mapped_column(Float, nullable=True)
+    max_longitude: Mapped[float] = mapped_column(Float, nullable=True)
+    # Per participant: distance, duration, speeds, point count and last position
+    participants: Mapped[list[dict]] = mapped_column(JSON, default=list)
+    # Encoded polyline (precision 5) of ~20 points for feed previews
+    preview_polyline: Mapped[str] = mapped_column(Text, default="")
+    computed_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    # Relationships
+    trip: Mapped["Trip"] = relationship("Trip", back_populates="stats")
+
+
+class TripLocationArchive(TelemetryMixin, Base):
+    """
+    Locations of an ended trip packed into one zlib-compressed columnar blob
+    (app.utils.location_codec format); the raw trip_locations rows are deleted.
+    """
+    __tablename__ = "trip_location_archives"
+    
+    trip_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("trips.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    point_count: Mapped[int] = mapped_column(Integer, default=0)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
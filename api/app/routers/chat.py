@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, Select
 from sqlalchemy.orm import selectinload
 from app.database import get_db
 from app.models.user import User
@@ -17,6 +17,28 @@ from app.utils.websockets import manager
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
+def map_messages_query(map_id: str, limit: int) -> Select:
+    """First messages of a map's chat, oldest first, with their authors' profiles."""
+    return (
+        select(ChatMessage)
+        .where(ChatMessage.map_id == map_id)
+        .options(selectinload(ChatMessage.user).selectinload(User.profile))
+        .order_by(ChatMessage.created_at.asc())
+        .limit(limit)
+    )
+
+
+def trip_messages_query(trip_id: str, limit: int) -> Select:
+    """First messages of a trip's chat, oldest first, with their authors' profiles."""
+    return (
+        select(ChatMessage)
+        .where(ChatMessage.trip_id == trip_id)
+        .options(selectinload(ChatMessage.user).selectinload(User.profile))
+        .order_by(ChatMessage.created_at.asc())
+        .limit(limit)
+    )
+
+
 async def check_map_access(map_id: str, user_id: str, db: AsyncSession) -> Map:
     """Verifica se o usuário tem acesso ao mapa."""
     result = await db.execute(select(Map).where(Map.id == map_id))
@@ -85,13 +107,7 @@ async def get_messages(
     """
     await check_map_access(map_id, current_user.id, db)
     
-    result = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.map_id == map_id)
-        .options(selectinload(ChatMessage.user).selectinload(User.profile))
-        .order_by(ChatMessage.created_at.asc())
-        .limit(limit)
-    )
+    result = await db.execute(map_messages_query(map_id, limit))
     messages = result.scalars().all()
     
     # Return directly as the relationship is pre-loaded
@@ -200,13 +216,7 @@ async def get_trip_messages(
     """
     await check_trip_access(trip_id, current_user.id, db)
     
-    result = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.trip_id == trip_id)
-        .options(selectinload(ChatMessage.user).selectinload(User.profile))
-        .order_by(ChatMessage.created_at.asc())
-        .limit(limit)
-    )
+    result = await db.execute(trip_messages_query(trip_id, limit))
     messages = result.scalars().all()
     
     return [
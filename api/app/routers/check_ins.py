@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, Select
 from datetime import datetime, timezone
 import os
 import uuid
@@ -19,6 +19,16 @@ from app.models.map import Map # Import Map for queries
 router = APIRouter(prefix="/check-ins", tags=["Check-ins"])
 
 
+def place_check_ins_query(place_id: str, limit: int) -> Select:
+    """Latest check-ins of a place."""
+    return (
+        select(CheckIn)
+        .where(CheckIn.place_id == place_id)
+        .order_by(CheckIn.visited_at.desc())
+        .limit(limit)
+    )
+
+
 @router.get("", response_model=list[CheckInWithDetails])
 async def get_check_ins(
     map_id: str | None = None,
@@ -47,12 +57,7 @@ async def get_check_ins(
             )
 
         # Filtrar por place_id específico
-        query = (
-            select(CheckIn)
-            .where(CheckIn.place_id == place_id)
-            .order_by(CheckIn.visited_at.desc())
-            .limit(limit)
-        )
+        query = place_check_ins_query(place_id, limit)
     elif map_id:
         # Check access to the map
         if not await check_map_access(db, map_id, current_user.id):
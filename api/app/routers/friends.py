@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_
+from sqlalchemy import select, or_, and_, Select
 from typing import List
 from app.database import get_db
 from app.models.user import User
@@ -15,10 +15,41 @@ from app.schemas.friendship import (
     FriendshipStatusEnum,
 )
 from app.utils.dependencies import get_current_user
+from app.utils.presence import presence
+from app.utils.websockets import manager
 
 router = APIRouter(prefix="/friends", tags=["Friends"])
 
 
+def accepted_friendships_query(user_id: str) -> Select:
+    """Accepted friendships where the user is either requester or addressee."""
+    return select(Friendship).where(
+        and_(
+            Friendship.status == FriendshipStatus.ACCEPTED,
+            or_(
+                Friendship.requester_id == user_id,
+                Friendship.addressee_id == user_id
+            )
+        )
+    )
+
+
+def received_requests_query(user_id: str) -> Select:
+    """Pending friend requests sent to the user."""
+    return select(Friendship).where(
+        and_(
+            Friendship.addressee_id == user_id,
+            Friendship.status == FriendshipStatus.PENDING
+        )
+    )
+
+
+async def _invalidate_friend_ids(*user_ids: str):
+    """Call after every Friendship change: drops the cached friend ids of both users on every worker."""
+    for user_id in user_ids:
+        await manager.invalidate_friend_cache(user_id)
+
+
 @router.get("", response_model=List[FriendResponse])
 async def get_friends(
     db: AsyncSession = Depends(get_db),
@@ -27,20 +58,12 @@ async def get_friends(
     """
     Retorna lista de amigos do usuário atual.
     """
-    # Get accepted friendships where user is either requester or addressee
-    result = await db.execute(
-        select(Friendship)
-        .where(
-            and_(
-                Friendship.status == FriendshipStatus.ACCEPTED,
-                or_(
-                    Friendship.requester_id == current_user.id,
-                    Friendship.addressee_id == current_user.id
-                )
-            )
-        )
-    )
+    result = await db.execute(accepted_friendships_query(current_user.id))
     friendships = result.scalars().all()
+    online = presence.lookup(
+        f.addressee_id if f.requester_id == current_user.id else f.requester_id
+        for f in friendships
+    )
     
     friends = []
     for friendship in friendships:
@@ -70,7 +93,8 @@ async def get_friends(
                 avatar_url=profile.avatar_url if profile else None,
                 bio=profile.bio if profile else None,
                 friendship_id=friendship.id,
-                is_online=False  # TODO: Implement online status
+                is_online=online[friend_id]["is_online"],
+                last_seen_at=online[friend_id]["last_seen_at"]
             ))
     
     return friends
@@ -84,15 +108,7 @@ async def get_friend_requests(
     """
     Retorna solicitações de amizade pendentes recebidas.
     """
-    result = await db.execute(
-        select(Friendship)
-        .where(
-            and_(
-                Friendship.addressee_id == current_user.id,
-                Friendship.status == FriendshipStatus.PENDING
-            )
-        )
-    )
+    result = await db.execute(received_requests_query(current_user.id))
     requests = result.scalars().all()
     
     response = []
@@ -217,6 +233,7 @@ async def send_friend_request(
             existing.addressee_id = data.addressee_id
             await db.commit()
             await db.refresh(existing)
+            await _invalidate_friend_ids(existing.requester_id, existing.addressee_id)
             return existing
     
     friendship = Friendship(
@@ -228,6 +245,7 @@ async def send_friend_request(
     db.add(friendship)
     await db.commit()
     await db.refresh(friendship)
+    await _invalidate_friend_ids(friendship.requester_id, friendship.addressee_id)
     
     # Notify addressee
     await manager.broadcast([data.addressee_id], {
@@ -278,10 +296,9 @@ async def respond_to_friend_request(
     friendship.status = FriendshipStatus(data.status.value)
     await db.commit()
     await db.refresh(friendship)
+    await _invalidate_friend_ids(friendship.requester_id, friendship.addressee_id)
     
     if friendship.status == FriendshipStatus.ACCEPTED:
-        manager.invalidate_friend_cache(friendship.requester_id)
-        manager.invalidate_friend_cache(friendship.addressee_id)
         await manager.broadcast([friendship.requester_id], {
             "type": "friend_request_accepted",
             "title": "Solicitação Aceita",
@@ -323,8 +340,7 @@ async def remove_friend(
     requester_id, addressee_id = friendship.requester_id, friendship.addressee_id
     await db.delete(friendship)
     await db.commit()
-    manager.invalidate_friend_cache(requester_id)
-    manager.invalidate_friend_cache(addressee_id)
+    await _invalidate_friend_ids(requester_id, addressee_id)
 
     return {"message": "Amizade removida com sucesso"}
 
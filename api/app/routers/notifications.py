@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, Select
 from typing import List
 
 from app.database import get_db
@@ -11,17 +11,22 @@ from app.utils.dependencies import get_current_user
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 
+def notifications_query(user_id: str) -> Select:
+    """A user's notifications, newest first."""
+    return (
+        select(Notification)
+        .where(Notification.user_id == user_id)
+        .order_by(Notification.created_at.desc())
+    )
+
+
 @router.get("", response_model=List[NotificationResponse])
 async def get_notifications(
     current_user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Fetch all notifications for the current user"""
-    result = await db.execute(
-        select(Notification)
-        .where(Notification.user_id == current_user.id)
-        .order_by(Notification.created_at.desc())
-    )
+    result = await db.execute(notifications_query(current_user.id))
     return result.scalars().all()
 
 
@@ -3,7 +3,6 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
 from sqlalchemy.orm import selectinload
 from app.models.profile import Profile
-from math import radians, cos, sin, asin, sqrt
 from app.database import get_db
 from app.models.user import User
 from app.models.map import Map
@@ -12,6 +11,8 @@ from app.models.map_member import MapMember
 from app.schemas.place import PlaceCreate, PlaceUpdate, PlaceResponse
 from app.utils.dependencies import get_current_user
 from app.utils.permissions import check_map_access
+from app.utils.geo import haversine_m
+from app.utils.websockets import manager
 
 router = APIRouter(prefix="/places", tags=["Places"])
 
@@ -107,9 +108,9 @@ async def create_place(
     db.add(new_place)
     await db.commit()
     await db.refresh(new_place)
+    await manager.invalidate_places(new_place.map_id)
 
     # Broadcast to map members so other clients can refresh places
-    from app.utils.websockets import manager
     member_ids_result = await db.execute(select(MapMember.user_id).where(MapMember.map_id == place_data.map_id))
     member_ids = set(member_ids_result.scalars().all())
     map_owner_result = await db.execute(select(Map.created_by).where(Map.id == place_data.map_id))
@@ -184,6 +185,7 @@ async def update_place(
     
     await db.commit()
     await db.refresh(place)
+    await manager.invalidate_places(place.map_id)
     
     return place
 
@@ -216,7 +218,6 @@ async def delete_place(
     place_id = place.id
 
     # Broadcast to map members before deleting so clients can refresh
-    from app.utils.websockets import manager
     member_ids_result = await db.execute(select(MapMember.user_id).where(MapMember.map_id == map_id))
     member_ids = set(member_ids_result.scalars().all())
     map_owner_result = await db.execute(select(Map.created_by).where(Map.id == map_id))
@@ -232,19 +233,7 @@ async def delete_place(
 
     await db.delete(place)
     await db.commit()
-
-
-def haversine(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
-    """
-    Calcula a distância em km entre dois pontos usando a fórmula de Haversine.
-    """
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371  # Raio da Terra em km
-    return c * r
+    await manager.invalidate_places(map_id)
 
 
 @router.get("/explore/nearby", response_model=list[PlaceResponse])
@@ -276,7 +265,7 @@ async def get_nearby_places(
     # Filtrar por distância usando Haversine
     nearby_places = []
     for place in all_places:
-        distance = haversine(lng, lat, place.lng, place.lat)
+        distance = haversine_m(lat, lng, place.lat, place.lng) / 1000
         if distance <= radius_km:
             # Add distance as a temporary attribute
             place._distance = distance
@@ -3,9 +3,10 @@ Router para funcionalidades sociais: Likes, Comments, Perfil Público
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, desc
+from sqlalchemy import select, func, and_, or_, desc, Select
 from sqlalchemy.orm import selectinload
 from datetime import datetime, timezone
+from typing import Sequence
 import json
 import traceback
 import logging
@@ -24,6 +25,8 @@ from app.schemas.social import (
 )
 from app.schemas.check_in import CheckInWithDetails
 from app.utils.dependencies import get_current_user
+from app.utils.friend_cache import get_friend_ids
+from app.utils.trip_stats import preview_points
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +36,19 @@ router = APIRouter(prefix="/social", tags=["Social"])
 # Helpers for Social Feed
 # =====================
 
+def feed_query(feed_type: str, user_id: str, friend_ids: Sequence[str] = ()) -> Select:
+    """
+    Posts of a feed, newest first (the caller pages it with offset/limit).
+    "following": the user's and their friends' posts; "personal": the user's; otherwise all.
+    """
+    query = select(SocialPost).join(User).outerjoin(Profile, Profile.user_id == SocialPost.user_id)
+    if feed_type == "following":
+        query = query.where(SocialPost.user_id.in_([*friend_ids, user_id]))
+    elif feed_type == "personal":
+        query = query.where(SocialPost.user_id == user_id)
+    return query.order_by(desc(SocialPost.created_at))
+
+
 async def get_social_content_details(db: AsyncSession, post_type: str, content_id: str):
     content_item = None
     if post_type == 'check_in':
@@ -65,16 +81,17 @@ async def get_social_content_details(db: AsyncSession, post_type: str, content_i
          res = await db.execute(
              select(Trip)
              .where(Trip.id == content_id)
-             .options(selectinload(Trip.participants), selectinload(Trip.locations))
+             .options(selectinload(Trip.participants), selectinload(Trip.stats))
          )
          trip = res.scalar_one_or_none()
          if trip:
              cr_res = await db.execute(select(Profile).where(Profile.user_id == trip.created_by))
              creator = cr_res.scalar_one_or_none()
              
-             all_locs = sorted(trip.locations, key=lambda l: l.recorded_at)
-             step = max(1, len(all_locs) // 20)
-             sampled_locs = [{"lat": l.latitude, "lng": l.longitude} for l in all_locs[::step]]
+             # Preview comes from the stats stored at trip end (backfill_trip_stats.py for
+             # older trips); reads never compute them, missing stats show as null
+             stats = trip.stats
+             sampled_locs = preview_points(stats) if stats else []
              
              favorite_photos = []
              try:
@@ -95,6 +112,8 @@ async def get_social_content_details(db: AsyncSession, post_type: str, content_i
                 ended_at=trip.ended_at,
                 participants_count=len(trip.participants),
                 locations=sampled_locs,
+                total_distance_m=stats.total_distance_m if stats else None,
+                duration_seconds=stats.duration_seconds if stats else None,
                 rating=trip.rating,
                 favorite_photos=favorite_photos,
                 creator_username=creator.username if creator else None,
@@ -174,27 +193,8 @@ async def get_social_feed(
         if limit > 100:
             limit = 100
             
-        query = select(SocialPost).join(User).outerjoin(Profile, Profile.user_id == SocialPost.user_id)
-        
-        if feed_type == "following":
-            # Get friends
-            friends_res = await db.execute(
-                select(Friendship).where(
-                    and_(Friendship.status == FriendshipStatus.ACCEPTED,
-                         or_(Friendship.requester_id == current_user.id, Friendship.addressee_id == current_user.id))
-                )
-            )
-            friend_ids = []
-            for f in friends_res.scalars().all():
-                 friend_ids.append(f.addressee_id if f.requester_id == current_user.id else f.requester_id)
-            friend_ids.append(current_user.id) # Include self
-            
-            query = query.where(SocialPost.user_id.in_(friend_ids))
-            
-        elif feed_type == "personal":
-            query = query.where(SocialPost.user_id == current_user.id)
-            
-        query = query.order_by(desc(SocialPost.created_at)).offset(skip).limit(limit)
+        friend_ids = await get_friend_ids(db, current_user.id) if feed_type == "following" else ()
+        query = feed_query(feed_type, current_user.id, friend_ids).offset(skip).limit(limit)
         
         result = await db.execute(query)
         posts = result.scalars().all()
@@ -279,15 +279,7 @@ async def get_friend_suggestions(
 ):
     """Sugestões de amigos"""
     # 1. Get my friends
-    my_friends_res = await db.execute(
-        select(Friendship).where(
-            and_(Friendship.status == FriendshipStatus.ACCEPTED,
-                 or_(Friendship.requester_id == current_user.id, Friendship.addressee_id == current_user.id))
-        )
-    )
-    my_friend_ids = set()
-    for f in my_friends_res.scalars().all():
-        my_friend_ids.add(f.addressee_id if f.requester_id == current_user.id else f.requester_id)
+    my_friend_ids = set(await get_friend_ids(db, current_user.id))
         
     if not my_friend_ids:
         # Fallback: Random users
@@ -1,29 +1,155 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, exists, Select
+from sqlalchemy.orm import selectinload, noload
 
 # ... (imports)
 
 from datetime import datetime, timezone
+from typing import Optional
 import uuid
+from app.config import settings
 from app.database import get_db
 from app.models import (
-    Trip, TripParticipant, TripLocation, Map, MapMember, User, 
+    Trip, TripParticipant, Map, MapMember, User, 
     GroupMap, GroupMember, Notification
 )
 from app.schemas.trip import (
     TripCreate, TripResponse, LocationUpdate, AddParticipantsRequest,
-    TripReportSubmit
+    TripReportSubmit, LocationBatch, TripPathSummary, TripLocationResponse
 )
 import json
 from app.utils.permissions import check_map_access
 from app.utils.dependencies import get_current_user
 from app.utils.websockets import manager
+from app.utils.geo import group_by_user, simplify_locations, simplify_paths
+from app.utils.location_codec import (
+    encode_polylines, encode_columnar, POLYLINE_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE
+)
+from app.utils.location_archive import archived_locations
+from app.utils.location_buffer import location_buffer
+from app.utils.trip_cache import live_positions
+from app.utils.trip_stats import compute_trip_stats, stats_path_summary
+from app.utils.trip_locations import (
+    get_location_participants, record_locations, broadcast_locations,
+    locations_query, encode_cursor, decode_cursor, stream_locations_ndjson, path_summaries,
+    filter_locations, iter_locations_ndjson, load_locations
+)
+from app.utils.trip_replay import replay_ndjson, replay_cache, frame_count
 from fastapi import WebSocket, WebSocketDisconnect
 
 router = APIRouter(prefix="/trips", tags=["trips"])
 
+
+def _trip_options(include_locations: bool = False) -> list:
+    """Participants with profiles; the full path is only loaded when requested"""
+    return [
+        selectinload(Trip.participants).selectinload(TripParticipant.user).selectinload(User.profile),
+        selectinload(Trip.locations) if include_locations else noload(Trip.locations),
+        selectinload(Trip.stats)
+    ]
+
+
+def participant_query(trip_id: str, user_id: str) -> Select:
+    """A user's participation in a trip."""
+    return select(TripParticipant).where(
+        (TripParticipant.trip_id == trip_id) & (TripParticipant.user_id == user_id)
+    )
+
+
+def active_trips_query(map_id: str) -> Select:
+    """Active trips of a map, newest first."""
+    return (
+        select(Trip)
+        .where((Trip.map_id == map_id) & (Trip.is_active == True))
+        .order_by(Trip.started_at.desc())
+    )
+
+
+def user_trip_history_queries(
+    user_id: str,
+    status: Optional[str] = None,
+    map_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> tuple[Select, Select]:
+    """
+    (started_at, id) of the trips the user takes part in, and of the trips they created,
+    each newest first. Two statements so that each reads an index in order (trips by
+    ix_trips_started probing the participant index; ix_trips_created_by_started) and
+    stops at the page size, instead of sorting the user's whole history; the caller
+    merges them.
+    """
+    conditions = []
+    if status is not None:
+        conditions.append(Trip.is_active == (status == "active"))
+    if map_id is not None:
+        conditions.append(Trip.map_id == map_id)
+    if cursor is not None:
+        before_at, before_id = decode_cursor(cursor)
+        conditions.append(
+            (Trip.started_at < before_at)
+            | ((Trip.started_at == before_at) & (Trip.id < before_id))
+        )
+    participating = select(Trip.started_at, Trip.id).where(
+        exists().where((TripParticipant.trip_id == Trip.id) & (TripParticipant.user_id == user_id))
+    )
+    created = select(Trip.started_at, Trip.id).where(Trip.created_by == user_id)
+    return tuple(
+        stmt.where(*conditions).order_by(Trip.started_at.desc(), Trip.id.desc())
+        for stmt in (participating, created)
+    )
+
+
+async def _trip_responses(
+    db: AsyncSession,
+    trips: list[Trip],
+    include_locations: bool = False,
+    tolerance: Optional[float] = None,
+    max_points: Optional[int] = None,
+    locations_format: Optional[str] = None
+) -> list[TripResponse]:
+    """
+    Serialize trips with a path summary (point count, bounding box, last positions).
+    Ended trips read it from their stored stats; the others aggregate their locations.
+    With include_locations the paths are embedded, simplified and/or polyline-encoded when requested.
+    """
+    summaries = await path_summaries(db, [trip.id for trip in trips if trip.stats is None])
+    archives = await archived_locations(db, [trip.id for trip in trips]) if include_locations else {}
+    responses = []
+    for trip in trips:
+        response = TripResponse.model_validate(trip, from_attributes=True)
+        summary = stats_path_summary(trip.stats) if trip.stats else summaries.get(trip.id, {})
+        response.path_summary = TripPathSummary.model_validate(summary)
+        if include_locations:
+            if trip.id in archives:
+                response.locations = [TripLocationResponse.model_validate(row) for row in archives[trip.id]]
+            if locations_format == "polyline":
+                paths = simplify_paths(group_by_user(response.locations), tolerance, max_points)
+                response.encoded_paths = encode_polylines(paths)
+                response.locations = []
+            elif tolerance is not None or max_points is not None:
+                response.locations = simplify_locations(response.locations, tolerance, max_points)
+        responses.append(response)
+    return responses
+
+
+def _wants_locations(include_locations, tolerance, max_points, locations_format) -> bool:
+    return include_locations or any(v is not None for v in (tolerance, max_points, locations_format))
+
+
+def _negotiate_locations_format(format: Optional[str], accept: str) -> str:
+    if format:
+        return format
+    if "application/x-ndjson" in accept:
+        return "ndjson"
+    if POLYLINE_MEDIA_TYPE in accept:
+        return "polyline"
+    if COLUMNAR_MEDIA_TYPE in accept or "application/octet-stream" in accept:
+        return "binary"
+    return "json"
+
+
 @router.post("", response_model=TripResponse)
 async def create_trip(
     trip_data: TripCreate,
@@ -155,10 +281,7 @@ async def create_trip(
     result = await db.execute(
         select(Trip)
         .where(Trip.id == trip_id)
-        .options(
-            selectinload(Trip.participants).selectinload(TripParticipant.user).selectinload(User.profile),
-            selectinload(Trip.locations)
-        )
+        .options(*_trip_options())
     )
     trip = result.scalars().first()
     
@@ -188,12 +311,16 @@ async def create_trip(
         "created_by": current_user.id
     }, db)
 
-    return trip
+    return (await _trip_responses(db, [trip]))[0]
 
 
 @router.get("/{map_id}", response_model=list[TripResponse])
 async def get_map_trips(
     map_id: str,
+    tolerance: Optional[float] = Query(None, gt=0, description="Simplification tolerance in meters"),
+    max_points: Optional[int] = Query(None, ge=2, description="Max points per participant path"),
+    locations_format: Optional[str] = Query(None, pattern="^(json|polyline)$", description="polyline: encoded_paths instead of locations"),
+    include_locations: bool = Query(False, description="Embed the full path instead of only the summary"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -212,36 +339,35 @@ async def get_map_trips(
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Get active trips with relationships
+    include_locations = _wants_locations(include_locations, tolerance, max_points, locations_format)
     trips_result = await db.execute(
-        select(Trip)
-        .where((Trip.map_id == map_id) & (Trip.is_active == True))
-        .options(
-            selectinload(Trip.participants).selectinload(TripParticipant.user).selectinload(User.profile),
-            selectinload(Trip.locations)
-        )
-        .order_by(Trip.started_at.desc())
+        active_trips_query(map_id).options(*_trip_options(include_locations))
     )
     trips = trips_result.scalars().all()
     
-    return trips
+    return await _trip_responses(db, trips, include_locations, tolerance, max_points, locations_format)
 
 
 @router.get("/t/{trip_id}", response_model=TripResponse)
 async def get_trip(
     trip_id: str,
+    tolerance: Optional[float] = Query(None, gt=0, description="Simplification tolerance in meters"),
+    max_points: Optional[int] = Query(None, ge=2, description="Max points per participant path"),
+    locations_format: Optional[str] = Query(None, pattern="^(json|polyline)$", description="polyline: encoded_paths instead of locations"),
+    include_locations: bool = Query(False, description="Embed the full path instead of only the summary"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get details for a specific trip"""
     
+    await location_buffer.flush_trip(trip_id)
+    
     # Get trip with relationships
+    include_locations = _wants_locations(include_locations, tolerance, max_points, locations_format)
     result = await db.execute(
         select(Trip)
         .where(Trip.id == trip_id)
-        .options(
-            selectinload(Trip.participants).selectinload(TripParticipant.user).selectinload(User.profile),
-            selectinload(Trip.locations)
-        )
+        .options(*_trip_options(include_locations))
     )
     trip = result.scalars().first()
     
@@ -256,7 +382,7 @@ async def get_trip(
         if not has_access:
             raise HTTPException(status_code=403, detail="Access denied")
             
-    return trip
+    return (await _trip_responses(db, [trip], include_locations, tolerance, max_points, locations_format))[0]
 
 
 @router.post("/{trip_id}/accept", response_model=TripResponse)
@@ -278,12 +404,7 @@ async def accept_trip(
         raise HTTPException(status_code=400, detail="Trip is not active")
     
     # Check participation
-    participant_result = await db.execute(
-        select(TripParticipant).where(
-            (TripParticipant.trip_id == trip_id) & 
-            (TripParticipant.user_id == current_user.id)
-        )
-    )
+    participant_result = await db.execute(participant_query(trip_id, current_user.id))
     participant = participant_result.scalars().first()
     
     if participant:
@@ -303,15 +424,13 @@ async def accept_trip(
         db.add(participant)
     
     await db.commit()
+    await manager.invalidate_trip(trip_id)
     
     # Re-fetch with full relationships
     result = await db.execute(
         select(Trip)
         .where(Trip.id == trip_id)
-        .options(
-            selectinload(Trip.participants).selectinload(TripParticipant.user).selectinload(User.profile),
-            selectinload(Trip.locations)
-        )
+        .options(*_trip_options())
     )
     trip = result.scalars().first()
 
@@ -337,7 +456,15 @@ async def accept_trip(
         "trip_id": trip.id
     })
     
-    return trip
+    # Send the joining user where everyone is right now
+    positions = await live_positions.get(db, trip.id)
+    await manager.send_personal_message({
+        "type": "positions_snapshot",
+        "trip_id": trip.id,
+        "positions": live_positions.serialize(positions)
+    }, current_user.id)
+    
+    return (await _trip_responses(db, [trip]))[0]
 
 
 @router.post("/{trip_id}/decline")
@@ -356,12 +483,7 @@ async def decline_trip(
         raise HTTPException(status_code=404, detail="Trip not found")
     
     # Check participation
-    participant_result = await db.execute(
-        select(TripParticipant).where(
-            (TripParticipant.trip_id == trip_id) & 
-            (TripParticipant.user_id == current_user.id)
-        )
-    )
+    participant_result = await db.execute(participant_query(trip_id, current_user.id))
     participant = participant_result.scalars().first()
     
     if not participant:
@@ -376,6 +498,7 @@ async def decline_trip(
     
     participant.status = "declined"
     await db.commit()
+    await manager.invalidate_trip(trip_id)
     
     # Create notification for creator
     notification = Notification(
@@ -486,6 +609,7 @@ async def add_trip_participants(
     
     if added_count > 0:
         await db.commit()
+        await manager.invalidate_trip(trip_id)
         
         # Notify new participants
         if new_participants_ids:
@@ -499,10 +623,7 @@ async def add_trip_participants(
     result = await db.execute(
         select(Trip)
         .where(Trip.id == trip_id)
-        .options(
-            selectinload(Trip.participants).selectinload(TripParticipant.user).selectinload(User.profile),
-            selectinload(Trip.locations)
-        )
+        .options(*_trip_options())
     )
     trip = result.scalars().first()
     
@@ -514,7 +635,7 @@ async def add_trip_participants(
             "trip_id": trip.id
         })
 
-    return trip
+    return (await _trip_responses(db, [trip]))[0]
 
 
 @router.delete("/{trip_id}/participants/{user_id}")
@@ -538,12 +659,7 @@ async def remove_trip_participant(
         raise HTTPException(status_code=403, detail="Only trip creator can remove participants")
         
     # Find participant
-    participant_result = await db.execute(
-        select(TripParticipant).where(
-            (TripParticipant.trip_id == trip_id) & 
-            (TripParticipant.user_id == user_id)
-        )
-    )
+    participant_result = await db.execute(participant_query(trip_id, user_id))
     participant = participant_result.scalars().first()
     
     if not participant:
@@ -552,6 +668,7 @@ async def remove_trip_participant(
     # Remove participant
     await db.delete(participant)
     await db.commit()
+    await manager.invalidate_trip(trip_id, left_user_id=user_id)
     
     # Notify remaining participants
     result = await db.execute(
@@ -590,12 +707,7 @@ async def leave_trip(
         raise HTTPException(status_code=404, detail="Trip not found")
     
     # Find participant
-    participant_result = await db.execute(
-        select(TripParticipant).where(
-            (TripParticipant.trip_id == trip_id) & 
-            (TripParticipant.user_id == current_user.id)
-        )
-    )
+    participant_result = await db.execute(participant_query(trip_id, current_user.id))
     participant = participant_result.scalars().first()
     
     if not participant:
@@ -606,6 +718,8 @@ async def leave_trip(
         trip.is_active = False
         trip.ended_at = datetime.now(timezone.utc)
         await db.commit() # Commit trip ending
+        await manager.invalidate_trip(trip_id, ended=True)
+        await compute_trip_stats(db, trip)
         
         # Notify everyone with persistent notifications
         result = await db.execute(
@@ -635,6 +749,7 @@ async def leave_trip(
     else:
         await db.delete(participant)
         await db.commit()
+        await manager.invalidate_trip(trip_id, left_user_id=current_user.id)
         
         # Notify remaining
         result = await db.execute(
@@ -697,6 +812,8 @@ async def end_trip(
     trip.is_active = False
     trip.ended_at = datetime.now(timezone.utc)
     await db.commit()
+    await manager.invalidate_trip(trip_id, ended=True)
+    await compute_trip_stats(db, trip)
     
     # Notify everyone with persistent notifications
     participant_ids = [p.user_id for p in trip.participants]
@@ -732,64 +849,97 @@ async def update_trip_location(
 ):
     """Update user location in a trip"""
     
-    # Verify trip active
+    # Verify trip active and participation
+    participant_ids = await get_location_participants(db, trip_id, current_user.id)
+    
+    # Create location record
+    rows = await record_locations(db, trip_id, current_user.id, [location])
+
+    # Broadcast location update to other participants
+    await broadcast_locations(participant_ids, trip_id, current_user.id, rows)
+    
+    return {"message": "Location updated successfully"}
+
+
+@router.post("/{trip_id}/location/batch")
+async def update_trip_location_batch(
+    trip_id: str,
+    batch: LocationBatch,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Record an ordered batch of location fixes in a single transaction"""
+    
+    # Participation is validated once for the whole batch
+    participant_ids = await get_location_participants(db, trip_id, current_user.id)
+    
+    rows = await record_locations(db, trip_id, current_user.id, batch.fixes)
+
+    # One coalesced event per batch
+    await broadcast_locations(participant_ids, trip_id, current_user.id, rows)
+    
+    return {
+        "message": "Locations updated successfully",
+        "count": len(rows),
+        "dropped": len(batch.fixes) - len(rows)
+    }
+
+
+@router.get("/{trip_id}/positions")
+async def get_trip_positions(
+    trip_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Latest known position of each participant"""
+    
     trip_result = await db.execute(
         select(Trip)
         .where(Trip.id == trip_id)
-        # We need participants to broadcast
         .options(selectinload(Trip.participants))
     )
     trip = trip_result.scalars().first()
     
-    if not trip or not trip.is_active:
-        raise HTTPException(status_code=400, detail="Trip not active")
-    
-    # Verify participation
-    participant = next((p for p in trip.participants if p.user_id == current_user.id), None)
-    
-    if not participant:
-        raise HTTPException(status_code=403, detail="Not a participant")
-        
-    if participant.status != 'accepted':
-        raise HTTPException(status_code=403, detail="You must accept the trip invitation to share location")
-    
-    # Create location record
-    trip_location = TripLocation(
-        trip_id=trip_id,
-        user_id=current_user.id,
-        latitude=location.latitude,
-        longitude=location.longitude,
-        accuracy=location.accuracy,
-        recorded_at=datetime.now(timezone.utc)
-    )
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
     
-    db.add(trip_location)
-    await db.commit()
-
-    # Broadcast location update to other participants
-    participant_ids = [p.user_id for p in trip.participants]
-    await manager.broadcast_trip_event(
-        participant_ids,
-        "location_updated",
-        {
-            "trip_id": trip_id,
-            "user_id": current_user.id,
-            "latitude": location.latitude,
-            "longitude": location.longitude,
-            "recorded_at": trip_location.recorded_at.isoformat()
-        }
-    )
+    is_part = any(p.user_id == current_user.id for p in trip.participants)
+    if trip.created_by != current_user.id and not is_part:
+        has_access = await check_map_access(db, trip.map_id, current_user.id)
+        if not has_access:
+            raise HTTPException(status_code=403, detail="Access denied")
     
-    return {"message": "Location updated successfully"}
+    positions = await live_positions.get(db, trip_id, is_active=trip.is_active)
+    return {
+        "trip_id": trip_id,
+        "is_active": trip.is_active,
+        "positions": live_positions.serialize(positions)
+    }
 
     
 @router.get("/{trip_id}/locations", response_model=list[dict])
 async def get_trip_locations(
     trip_id: str,
+    request: Request,
+    response: Response,
+    since: Optional[datetime] = Query(None, description="Only locations recorded at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only locations recorded before this time"),
+    user_id: Optional[str] = Query(None, description="Only this participant's locations"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size (keyset pagination)"),
+    format: Optional[str] = Query(None, pattern="^(json|ndjson|polyline|binary)$"),
+    tolerance: Optional[float] = Query(None, gt=0, description="Simplification tolerance in meters"),
+    max_points: Optional[int] = Query(None, ge=2, description="Max points per participant path"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all locations recorded for a trip"""
+    """
+    Get the locations recorded for a trip, ordered by (recorded_at, id).
+    With limit, pages are keyset-paginated and the next page's cursor is sent in X-Next-Cursor.
+    format=ndjson (or Accept: application/x-ndjson) streams every matching row as NDJSON.
+    format=polyline / binary (or the matching Accept media types) return an encoded polyline
+    per participant or the compact columnar encoding from app.utils.location_codec.
+    """
     
     # Get trip
     trip_result = await db.execute(select(Trip).where(Trip.id == trip_id))
@@ -800,63 +950,138 @@ async def get_trip_locations(
         
     # Check access (is participant or creator)
     # Since we don't have participants loaded, we query
-    is_part_result = await db.execute(
-        select(TripParticipant).where(
-            (TripParticipant.trip_id == trip_id) & 
-            (TripParticipant.user_id == current_user.id)
-        )
-    )
+    is_part_result = await db.execute(participant_query(trip_id, current_user.id))
     is_participant = is_part_result.scalars().first()
     
     if trip.created_by != current_user.id and not is_participant:
          raise HTTPException(status_code=403, detail="Access denied")
 
-    result = await db.execute(
-        select(TripLocation)
-        .where(TripLocation.trip_id == trip_id)
-        .order_by(TripLocation.recorded_at.asc())
-    )
-    locations = result.scalars().all()
+    await location_buffer.flush_trip(trip_id)
+    archived = (await archived_locations(db, [trip_id])).get(trip_id)
+    if archived is not None:
+        archived = filter_locations(archived, since=since, until=until, user_id=user_id, cursor=cursor)
+    stmt = locations_query(trip_id, since=since, until=until, user_id=user_id, cursor=cursor)
+
+    format = _negotiate_locations_format(format, request.headers.get("accept", ""))
+    if format == "ndjson":
+        if tolerance is not None or max_points is not None:
+            raise HTTPException(status_code=400, detail="Simplification is not available when streaming")
+        rows = iter_locations_ndjson(archived) if archived is not None else stream_locations_ndjson(stmt)
+        return StreamingResponse(rows, media_type="application/x-ndjson")
+
+    if archived is not None:
+        locations = archived[:limit + 1] if limit is not None else archived
+    else:
+        if limit is not None:
+            stmt = stmt.limit(limit + 1)
+        result = await db.execute(stmt)
+        locations = [dict(row) for row in result.mappings().all()]
+
+    headers = {}
+    if limit is not None and len(locations) > limit:
+        locations = locations[:limit]
+        last = locations[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["recorded_at"], last["id"])
+    
+    if format == "polyline":
+        paths = simplify_paths(group_by_user(locations), tolerance, max_points)
+        return JSONResponse(
+            {"precision": 5, "paths": encode_polylines(paths)},
+            media_type=POLYLINE_MEDIA_TYPE,
+            headers=headers
+        )
+    locations = simplify_locations(locations, tolerance, max_points)
+    if format == "binary":
+        return Response(encode_columnar(locations), media_type=COLUMNAR_MEDIA_TYPE, headers=headers)
+
+    response.headers.update(headers)
+    return locations
+
+
+@router.get("/{trip_id}/replay")
+async def get_trip_replay(
+    trip_id: str,
+    frame_ms: int = Query(1000, ge=100, le=3600000, description="Time step between frames"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream synchronized playback frames (NDJSON, see app.utils.trip_replay): every
+    participant's interpolated position each frame_ms. Ended trips are cached per frame size.
+    """
+    trip_result = await db.execute(select(Trip).where(Trip.id == trip_id))
+    trip = trip_result.scalars().first()
     
-    return [
-        {
-            "id": loc.id,
-            "user_id": loc.user_id,
-            "latitude": loc.latitude,
-            "longitude": loc.longitude,
-            "accuracy": loc.accuracy,
-            "recorded_at": loc.recorded_at
-        }
-        for loc in locations
-    ]
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    
+    is_part_result = await db.execute(participant_query(trip_id, current_user.id))
+    if trip.created_by != current_user.id and not is_part_result.scalars().first():
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    headers = {"Cache-Control": "private, max-age=86400"} if not trip.is_active else {"Cache-Control": "no-store"}
+    if not trip.is_active:
+        cached = replay_cache.get(trip_id, frame_ms)
+        if cached is not None:
+            return StreamingResponse(iter(cached), media_type="application/x-ndjson", headers=headers)
+    
+    await location_buffer.flush_trip(trip_id)
+    rows = await load_locations(db, trip_id)
+    if frame_count(rows, frame_ms) > settings.trip_replay_max_frames:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many frames for this trip; use a larger frame_ms (max {settings.trip_replay_max_frames} frames)"
+        )
+    
+    chunks = replay_ndjson(trip_id, rows, frame_ms)
+    if not trip.is_active:
+        chunks = replay_cache.stream_and_store(trip_id, frame_ms, chunks)
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
 
 
 @router.get("/user/{user_id}", response_model=list[TripResponse])
 async def get_user_trip_history(
     user_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size; omit for the whole history"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    status: Optional[str] = Query(None, pattern="^(active|ended)$", description="Only active or ended trips"),
+    map_id: Optional[str] = Query(None, description="Only trips of this map"),
+    tolerance: Optional[float] = Query(None, gt=0, description="Simplification tolerance in meters"),
+    max_points: Optional[int] = Query(None, ge=2, description="Max points per participant path"),
+    locations_format: Optional[str] = Query(None, pattern="^(json|polyline)$", description="polyline: encoded_paths instead of locations"),
+    include_locations: bool = Query(False, description="Embed the full path instead of only the summary"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get trip history for a user"""
+    """
+    Get trip history for a user, newest first, ordered by (started_at, id).
+    Pass limit to paginate: the next page's cursor is then sent in X-Next-Cursor.
+    """
     
-    # Get trips where user is a participant or creator
+    # Trips where user is a participant or creator
     # Also load participants and profiles for the "Book of Memories" view
+    include_locations = _wants_locations(include_locations, tolerance, max_points, locations_format)
+    keys = set()
+    for stmt in user_trip_history_queries(user_id, status, map_id, cursor):
+        if limit is not None:
+            stmt = stmt.limit(limit + 1)
+        keys.update(tuple(row) for row in (await db.execute(stmt)).all())
+    keys = sorted(keys, reverse=True)
+    
+    if limit is not None and len(keys) > limit:
+        keys = keys[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(*keys[-1])
+    
     result = await db.execute(
         select(Trip)
-        .join(TripParticipant)
-        .where(
-            (Trip.created_by == user_id) | (TripParticipant.user_id == user_id)
-        )
-        .options(
-            selectinload(Trip.participants).selectinload(TripParticipant.user).selectinload(User.profile),
-            selectinload(Trip.locations)
-        )
-        .distinct()
-        .order_by(Trip.started_at.desc())
+        .where(Trip.id.in_([trip_id for _, trip_id in keys]))
+        .options(*_trip_options(include_locations))
     )
-    trips = result.scalars().all()
+    by_id = {trip.id: trip for trip in result.scalars().all()}
+    trips = [by_id[trip_id] for _, trip_id in keys if trip_id in by_id]
     
-    return trips
+    return await _trip_responses(db, trips, include_locations, tolerance, max_points, locations_format)
 
 
 @router.post("/{trip_id}/report", response_model=TripResponse)
@@ -872,10 +1097,7 @@ async def submit_trip_report(
     result = await db.execute(
         select(Trip)
         .where(Trip.id == trip_id)
-        .options(
-            selectinload(Trip.participants).selectinload(TripParticipant.user).selectinload(User.profile),
-            selectinload(Trip.locations)
-        )
+        .options(*_trip_options())
     )
     trip = result.scalars().first()
     
@@ -896,4 +1118,4 @@ async def submit_trip_report(
     await db.commit()
     await db.refresh(trip)
     
-    return trip
+    return (await _trip_responses(db, [trip]))[0]
@@ -2,6 +2,8 @@ from app.utils.websockets import manager
 from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from typing import Optional
+import logging
 from app.database import get_db
 from app.models.user import User
 from app.models.profile import Profile
@@ -10,6 +12,7 @@ from app.schemas.user import UserWithProfile
 from app.utils.dependencies import get_current_user
 
 router = APIRouter(prefix="/users", tags=["Users"])
+logger = logging.getLogger(__name__)
 
 
 @router.get("/me", response_model=UserWithProfile)
@@ -123,22 +126,28 @@ async def get_user_profile(
 
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, token: str):
+async def websocket_endpoint(
+    websocket: WebSocket, token: str, last_seq: Optional[int] = None, stream: Optional[str] = None
+):
     """
     WebSocket para notificações em tempo real. Heartbeat: server sends ping every 30s;
     client should respond with pong to keep connection alive.
+    The first frame is {"type": "hello", "stream", "seq"}; events then carry "seq".
+    On reconnect pass ?last_seq=&stream= to receive the missed events, or
+    {"type": "resync_required"} if they are gone and state must be refetched.
+    Clients may also publish {"type": "trip_location", "trip_id", "ref", ...fix or "fixes"};
+    each frame is answered with location_ack or location_error.
     """
-    import asyncio
     import json
     from app.utils.security import verify_access_token
+    from app.utils.trip_locations import ingest_location_frame
 
     user_id = verify_access_token(token)
     if not user_id:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    await manager.connect(websocket, user_id)
-    heartbeat_task = asyncio.create_task(manager._heartbeat_loop(websocket, user_id))
+    await manager.connect(websocket, user_id, last_seq=last_seq, stream=stream)
     try:
         while True:
             data = await websocket.receive_text()
@@ -147,14 +156,20 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
                 msg = json.loads(data)
                 if msg.get("type") == "pong":
                     pass
-            except (json.JSONDecodeError, TypeError):
+                elif msg.get("type") == "trip_location":
+                    try:
+                        ack = await ingest_location_frame(user_id, msg)
+                    except Exception as e:
+                        # A failed frame must not take the connection down with it
+                        logger.error(f"Error handling trip_location from user {user_id}: {e}")
+                        ack = {
+                            "type": "location_error", "trip_id": msg.get("trip_id"), "ref": msg.get("ref"),
+                            "detail": "Could not record locations",
+                        }
+                    manager.send_to_socket(websocket, ack)
+            except (json.JSONDecodeError, TypeError, AttributeError):
                 pass
     except WebSocketDisconnect:
         pass
     finally:
-        heartbeat_task.cancel()
-        try:
-            await heartbeat_task
-        except asyncio.CancelledError:
-            pass
         manager.disconnect(websocket, user_id)
@@ -53,6 +53,7 @@ class FriendResponse(BaseModel):
     bio: Optional[str] = None
     friendship_id: str
     is_online: bool = False
+    last_seen_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
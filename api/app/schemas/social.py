@@ -200,6 +200,8 @@ class TripBookResponse(BaseModel):
     ended_at: datetime | None = None
     participants_count: int
     locations: list[dict] # Coordenadas para o traçado
+    total_distance_m: float | None = None
+    duration_seconds: float | None = None
     rating: int | None
     favorite_photos: list[str] = []
     
@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 import json
 
@@ -15,6 +15,49 @@ class TripLocationResponse(BaseModel):
 
 from app.schemas.user import UserWithProfile
 
+
+class TripLastPosition(BaseModel):
+    user_id: str
+    latitude: float
+    longitude: float
+    accuracy: float
+    recorded_at: datetime
+
+
+class TripPathSummary(BaseModel):
+    """Lightweight view of a trip's path: no individual points."""
+    point_count: int = 0
+    min_latitude: Optional[float] = None
+    min_longitude: Optional[float] = None
+    max_latitude: Optional[float] = None
+    max_longitude: Optional[float] = None
+    last_positions: list[TripLastPosition] = []
+
+
+class TripParticipantStats(BaseModel):
+    user_id: str
+    point_count: int
+    distance_m: float
+    duration_seconds: float
+    max_speed_mps: float
+    avg_speed_mps: float
+
+
+class TripStatsResponse(BaseModel):
+    """Statistics computed once when the trip ended."""
+    point_count: int
+    duration_seconds: float
+    total_distance_m: float
+    max_speed_mps: float
+    avg_speed_mps: float
+    participants: list[TripParticipantStats] = []
+    preview_polyline: str = ""
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class TripParticipantResponse(BaseModel):
     id: str
     user_id: str
@@ -48,7 +91,13 @@ class TripResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     participants: list[TripParticipantResponse]
-    locations: list[TripLocationResponse]
+    # Only filled when the full path is requested (include_locations)
+    locations: list[TripLocationResponse] = []
+    path_summary: Optional[TripPathSummary] = None
+    # Filled instead of locations when locations_format=polyline (keyed by user_id)
+    encoded_paths: Optional[dict[str, dict]] = None
+    # Only present for ended trips
+    stats: Optional[TripStatsResponse] = None
     
     # Report fields
     rating: Optional[int] = None
@@ -86,6 +135,14 @@ class LocationUpdate(BaseModel):
     accuracy: float = 0.0
 
 
+class LocationFix(LocationUpdate):
+    recorded_at: Optional[datetime] = None  # Client timestamp; server time if omitted
+
+
+class LocationBatch(BaseModel):
+    fixes: List[LocationFix] = Field(..., min_length=1, max_length=500)
+
+
 class TripReportSubmit(BaseModel):
     rating: int
     favorite_photos: List[str]
@@ -0,0 +1,151 @@
+"""
+WebSocket fan-out across workers. ConnectionManager publishes every broadcast as an
+envelope ({"op": ..., ...}) to the backplane, and each worker delivers the envelopes
+it receives to its own sockets only.
+
+- LocalBackplane: single process, envelopes are handed straight back to the manager.
+- SqliteBackplane: workers on the same host share an append-only SQLite table; each
+  worker delivers its own envelopes immediately and polls for the others'.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import orjson
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class LocalBackplane:
+    """In-process backplane (one uvicorn worker)."""
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._handler: Optional[Handler] = None
+        self.counters = {"published": 0, "received": 0}
+
+    def subscribe(self, handler: Handler):
+        self._handler = handler
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, envelope: Dict[str, Any]):
+        self.counters["published"] += 1
+        if self._handler is not None:
+            await self._handler(envelope)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "local", "worker_id": self.worker_id, **self.counters}
+
+
+class SqliteBackplane(LocalBackplane):
+    """
+    Cross-process backplane for several workers on one host. Envelopes are appended to
+    a WAL-mode SQLite file; every worker tails it from the last id it has seen and
+    skips its own rows (already delivered locally on publish). Old rows are pruned
+    after retention_s.
+    """
+
+    def __init__(self, path: str, poll_ms: int = 50, retention_s: int = 60):
+        super().__init__()
+        self.path = path
+        self.poll_ms = poll_ms
+        self.retention_s = retention_s
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ws_events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " origin TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM ws_events").fetchone()[0]
+        self._task: Optional[asyncio.Task] = None
+        self.counters["polls"] = 0
+        self.counters["failed"] = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, envelope: Dict[str, Any]):
+        payload = orjson.dumps(envelope).decode()
+        await asyncio.to_thread(self._insert, payload)
+        await super().publish(envelope)
+
+    def _insert(self, payload: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ws_events (origin, payload, created_at) VALUES (?, ?, ?)",
+                (self.worker_id, payload, time.time()),
+            )
+
+    def _read_new(self) -> List[Tuple[int, str, str]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, origin, payload FROM ws_events WHERE id > ? ORDER BY id",
+                (self._last_id,),
+            ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        return rows
+
+    def _prune(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM ws_events WHERE created_at < ?", (time.time() - self.retention_s,))
+
+    async def _poll_loop(self):
+        last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_ms / 1000)
+            try:
+                self.counters["polls"] += 1
+                for row_id, origin, payload in await asyncio.to_thread(self._read_new):
+                    if origin == self.worker_id or self._handler is None:
+                        continue
+                    self.counters["received"] += 1
+                    try:
+                        await self._handler(orjson.loads(payload))
+                    except Exception as e:
+                        # One bad envelope must not cost the rest of the batch
+                        self.counters["failed"] += 1
+                        logger.error(f"Error handling WebSocket backplane event {row_id}: {e}")
+                if time.monotonic() - last_prune > self.retention_s:
+                    await asyncio.to_thread(self._prune)
+                    last_prune = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error polling WebSocket backplane: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "backend": "sqlite", "last_id": self._last_id}
+
+
+def create_backplane() -> LocalBackplane:
+    if settings.ws_backplane == "sqlite":
+        return SqliteBackplane(
+            settings.ws_backplane_path,
+            poll_ms=settings.ws_backplane_poll_ms,
+            retention_s=settings.ws_backplane_retention_s,
+        )
+    return LocalBackplane()
@@ -0,0 +1,34 @@
+from typing import Tuple
+from sqlalchemy import select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.friendship import Friendship, FriendshipStatus
+from app.utils.cache import TTLCache
+
+# user_id -> ids of accepted friends. Invalidated for both users on every Friendship
+# change (through ConnectionManager.invalidate_friend_cache, so on every worker);
+# the TTL bounds staleness if an invalidation is ever missed.
+friend_ids_cache = TTLCache(settings.friend_cache_size, settings.friend_cache_ttl_s)
+
+
+async def get_friend_ids(db: AsyncSession, user_id: str) -> Tuple[str, ...]:
+    friend_ids = friend_ids_cache.get(user_id)
+    if friend_ids is None:
+        result = await db.execute(
+            select(Friendship.requester_id, Friendship.addressee_id)
+            .where(
+                and_(
+                    Friendship.status == FriendshipStatus.ACCEPTED,
+                    or_(
+                        Friendship.requester_id == user_id,
+                        Friendship.addressee_id == user_id
+                    )
+                )
+            )
+        )
+        friend_ids = tuple(
+            addressee_id if requester_id == user_id else requester_id
+            for requester_id, addressee_id in result.all()
+        )
+        friend_ids_cache.set(user_id, friend_ids)
+    return friend_ids
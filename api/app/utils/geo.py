@@ -0,0 +1,140 @@
+from typing import Any, Dict, Iterable, List, Optional
+import heapq
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters between two points (scalar; see segment_distances for arrays)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def project(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Equirectangular projection to meters around the path's mean latitude (n x 2)."""
+    lat0 = np.radians(np.mean(lats)) if len(lats) else 0.0
+    x = np.radians(lngs) * np.cos(lat0) * EARTH_RADIUS_M
+    y = np.radians(lats) * EARTH_RADIUS_M
+    return np.column_stack((x, y))
+
+
+def segment_distances(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Haversine distance in meters between consecutive points (n - 1 values)."""
+    phi = np.radians(np.asarray(lats, dtype=np.float64))
+    lmb = np.radians(np.asarray(lngs, dtype=np.float64))
+    a = np.sin(np.diff(phi) / 2) ** 2 + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(np.diff(lmb) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _max_deviation(xy: np.ndarray, start: int, end: int) -> tuple[float, int]:
+    """Largest perpendicular distance from xy[start+1:end] to the segment start-end."""
+    if end - start < 2:
+        return 0.0, -1
+    a, b = xy[start], xy[end]
+    inner = xy[start + 1:end]
+    ab = b - a
+    length_sq = float(ab @ ab)
+    if length_sq == 0.0:
+        dist = np.hypot(*(inner - a).T)
+    else:
+        t = np.clip(((inner - a) @ ab) / length_sq, 0.0, 1.0)
+        dist = np.hypot(*(inner - (a + t[:, None] * ab)).T)
+    i = int(np.argmax(dist))
+    return float(dist[i]), start + 1 + i
+
+
+def simplify_indices(
+    lats: Iterable[float],
+    lngs: Iterable[float],
+    tolerance_m: Optional[float] = None,
+    max_points: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Ranked Douglas-Peucker: repeatedly keeps the point that deviates most from the current
+    path until every deviation is below tolerance_m or max_points are kept.
+    Returns the sorted indices of the kept points (endpoints always included).
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    n = len(lats)
+    if n <= 2 or (tolerance_m is None and max_points is None):
+        return np.arange(n)
+    if max_points is not None and max_points >= n:
+        return np.arange(n)
+
+    xy = project(lats, lngs)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    kept = 2
+    limit = max(2, max_points) if max_points is not None else n
+
+    dist, index = _max_deviation(xy, 0, n - 1)
+    heap = [(-dist, index, 0, n - 1)]
+    while heap and kept < limit:
+        neg_dist, index, start, end = heapq.heappop(heap)
+        if index < 0 or (tolerance_m is not None and -neg_dist <= tolerance_m):
+            break
+        keep[index] = True
+        kept += 1
+        for a, b in ((start, index), (index, end)):
+            d, i = _max_deviation(xy, a, b)
+            if i >= 0:
+                heapq.heappush(heap, (-d, i, a, b))
+
+    return np.flatnonzero(keep)
+
+
+def location_field(item: Any, name: str) -> Any:
+    """Read a location attribute from an ORM row, a schema or a dict."""
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+def group_by_user(locations: Iterable[Any]) -> Dict[str, List[Any]]:
+    """Each participant's path, ordered by recorded_at."""
+    paths: Dict[str, List[Any]] = {}
+    for loc in sorted(locations, key=lambda l: location_field(l, "recorded_at")):
+        paths.setdefault(location_field(loc, "user_id"), []).append(loc)
+    return paths
+
+
+def simplify_paths(
+    paths: Dict[str, List[Any]],
+    tolerance_m: Optional[float] = None,
+    max_points: Optional[int] = None,
+) -> Dict[str, List[Any]]:
+    """Simplify paths grouped by group_by_user (max_points applies per participant)."""
+    if tolerance_m is None and max_points is None:
+        return paths
+    simplified = {}
+    for user_id, path in paths.items():
+        indices = simplify_indices(
+            [location_field(l, "latitude") for l in path],
+            [location_field(l, "longitude") for l in path],
+            tolerance_m=tolerance_m,
+            max_points=max_points,
+        )
+        simplified[user_id] = [path[i] for i in indices]
+    return simplified
+
+
+def simplify_locations(
+    locations: List[Any],
+    tolerance_m: Optional[float] = None,
+    max_points: Optional[int] = None,
+) -> List[Any]:
+    """
+    Simplify each participant's path separately (max_points applies per participant).
+    Accepts ORM rows, schemas or dicts with user_id/latitude/longitude/recorded_at.
+    """
+    if tolerance_m is None and max_points is None:
+        return locations
+
+    paths = simplify_paths(group_by_user(locations), tolerance_m, max_points)
+    simplified = [loc for path in paths.values() for loc in path]
+    simplified.sort(key=lambda l: location_field(l, "recorded_at"))
+    return simplified
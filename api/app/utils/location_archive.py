@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+import logging
+import zlib
+from sqlalchemy import select, delete, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Trip, TripLocation, TripLocationArchive, TripStats
+from app.utils.location_codec import encode_columnar, decode_columnar, COORD_SCALE
+
+logger = logging.getLogger(__name__)
+
+
+def pack_locations(rows: List[Any]) -> bytes:
+    return zlib.compress(encode_columnar(rows), 6)
+
+
+def unpack_locations(trip_id: str, data: bytes) -> List[Dict[str, Any]]:
+    """
+    Archived rows ordered by (recorded_at, id). The original ids are not kept:
+    each row gets a stable synthetic id from its position in the trip.
+    """
+    rows = sorted(decode_columnar(zlib.decompress(data)), key=lambda r: r["recorded_at"])
+    return [{"id": f"{trip_id}:{i:07d}", **row} for i, row in enumerate(rows)]
+
+
+def archives_query(trip_ids: List[str]) -> Select:
+    return (
+        select(TripLocationArchive.trip_id, TripLocationArchive.data)
+        .where(TripLocationArchive.trip_id.in_(trip_ids))
+    )
+
+
+async def archived_locations(db: AsyncSession, trip_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Unpacked locations of the archived trips among trip_ids (others are left out)."""
+    if not trip_ids:
+        return {}
+    result = await db.execute(archives_query(trip_ids))
+    return {trip_id: unpack_locations(trip_id, data) for trip_id, data in result.all()}
+
+
+def _points(rows: List[Dict[str, Any]]) -> List[tuple]:
+    """Rows as comparable (user_id, lat E6, lng E6), in a fixed order."""
+    return sorted(
+        (row["user_id"], round(row["latitude"] * COORD_SCALE), round(row["longitude"] * COORD_SCALE))
+        for row in rows
+    )
+
+
+def verify_archive(trip_id: str, rows: List[Dict[str, Any]], data: bytes):
+    """Raise ValueError unless the blob decodes back to the same points as rows."""
+    unpacked = unpack_locations(trip_id, data)
+    if len(unpacked) != len(rows):
+        raise ValueError(f"Archive of trip {trip_id} decodes to {len(unpacked)} points, expected {len(rows)}")
+    if _points(unpacked) != _points(rows):
+        raise ValueError(f"Archive of trip {trip_id} does not decode to the original coordinates")
+
+
+async def archive_trip(db: AsyncSession, trip: Trip) -> int:
+    """
+    Pack an ended trip's locations into its archive blob and delete the raw rows.
+    Stats are computed first (from the raw rows) if the trip has none. The blob is
+    decoded and checked against the rows before they are deleted (ValueError otherwise).
+    Returns the archived row count.
+    """
+    from app.utils.location_buffer import location_buffer
+    from app.utils.trip_locations import locations_query
+    from app.utils.trip_stats import compute_trip_stats
+
+    if trip.is_active:
+        raise ValueError("Cannot archive an active trip")
+
+    await location_buffer.flush_trip(trip.id)
+    if await db.get(TripStats, trip.id) is None:
+        await compute_trip_stats(db, trip)
+
+    result = await db.execute(locations_query(trip.id))
+    rows = [dict(row) for row in result.mappings().all()]
+    if not rows:
+        return 0
+
+    data = pack_locations(rows)
+    verify_archive(trip.id, rows, data)
+    db.add(TripLocationArchive(trip_id=trip.id, point_count=len(rows), data=data))
+    await db.execute(delete(TripLocation).where(TripLocation.trip_id == trip.id))
+    await db.commit()
+    return len(rows)
+
+
+async def archive_ended_trips(db: AsyncSession, older_than_days: int, limit: int = 100) -> Dict[str, int]:
+    """
+    Archive trips ended more than older_than_days ago that still have raw locations.
+    Trips and locations may live in different databases, so they are never joined.
+    """
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than_days)
+    pending = (
+        select(TripLocation.trip_id)
+        .group_by(TripLocation.trip_id)
+    )
+    archived = {}
+    result = await db.execute(
+        select(Trip.id)
+        .where(Trip.is_active == False, Trip.ended_at < cutoff)
+        .order_by(Trip.ended_at)
+    )
+    ended_ids = result.scalars().all()
+    for start in range(0, len(ended_ids), 500):
+        chunk = ended_ids[start:start + 500]
+        with_rows = set((await db.execute(pending.where(TripLocation.trip_id.in_(chunk)))).scalars().all())
+        for trip_id in chunk:
+            if trip_id not in with_rows:
+                continue
+            trip = await db.get(Trip, trip_id)
+            try:
+                archived[trip_id] = await archive_trip(db, trip)
+            except ValueError as e:
+                # Raw rows are kept; the trip is retried on the next run
+                await db.rollback()
+                logger.error(f"Not archiving trip {trip_id}: {e}")
+                continue
+            if len(archived) >= limit:
+                return archived
+    return archived
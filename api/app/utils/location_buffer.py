@@ -0,0 +1,204 @@
+from typing import Any, Dict, List, Tuple
+import asyncio
+import logging
+import time
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError, OperationalError
+from app.config import settings
+from app.database import telemetry_session
+from app.models import TripLocation
+
+logger = logging.getLogger(__name__)
+
+
+class LocationWriteBuffer:
+    """
+    Write-behind queue for TripLocation rows.
+    Rows are flushed with a single bulk insert when flush_rows are pending or every
+    flush_interval seconds; enqueue blocks while max_pending rows are waiting, counting
+    the rows of failed batches.
+
+    A batch that fails is retried on the next flushes, apart from the new rows:
+    - transient errors (OperationalError, e.g. a locked database) keep it queued for as
+      long as they last, so an outage turns into backpressure, not data loss;
+    - rows rejected by the database itself (e.g. a trip deleted meanwhile) are found by
+      writing the batch one row at a time, and only those rows are dropped;
+    - any other error is retried max_attempts times, then the batch is dropped (logged)
+      so a batch that can never be written does not block ingest.
+    """
+
+    def __init__(self, flush_rows: int, flush_interval: float, max_pending: int, max_attempts: int = 20):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending: List[Dict[str, Any]] = []
+        self._retry: List[Tuple[List[Dict[str, Any]], int]] = []  # (rows, failed attempts)
+        self._retry_rows = 0
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+        self.flushed_rows = 0
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.dropped_rows = 0
+        self.backpressure_waits = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop (letting an in-flight flush finish) and drain everything still pending."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def queue_depth(self) -> int:
+        return len(self._pending) + self._retry_rows
+
+    async def enqueue(self, rows: List[Dict[str, Any]]):
+        while self.queue_depth() >= self.max_pending:
+            self.backpressure_waits += 1
+            self._space.clear()
+            self._wakeup.set()
+            await self._space.wait()
+
+        self._pending.extend(rows)
+        if self._task is None:
+            # No flush loop running (scripts, shutdown): write through
+            await self.flush()
+        elif len(self._pending) >= self.flush_rows:
+            self._wakeup.set()
+
+    def has_pending(self, trip_id: str) -> bool:
+        return any(row["trip_id"] == trip_id for row in self._pending) or any(
+            row["trip_id"] == trip_id for rows, _ in self._retry for row in rows
+        )
+
+    async def flush_trip(self, trip_id: str):
+        """Flush before reading a trip's locations so readers see their own writes."""
+        if self.has_pending(trip_id):
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            rows, self._pending = self._pending, []
+            batches, self._retry = self._retry, []
+            self._retry_rows = 0
+            if rows:
+                batches.append((rows, 0))
+            try:
+                while batches:
+                    if not await self._write(*batches[0]):
+                        break  # database unavailable: keep this batch and the rest queued
+                    batches.pop(0)
+            finally:
+                # Also when cancelled mid-flush: nothing that was taken out is lost
+                for batch in batches:
+                    self._requeue(*batch)
+                if self.queue_depth() < self.max_pending:
+                    self._space.set()
+
+    async def _write(self, rows: List[Dict[str, Any]], attempts: int) -> bool:
+        """Write a batch; False if the database is unavailable and the batch must stay queued."""
+        started = time.perf_counter()
+        try:
+            async with telemetry_session() as db:
+                await db.execute(insert(TripLocation), rows)
+                await db.commit()
+        except OperationalError as e:
+            self.failed_flushes += 1
+            logger.error(f"Database unavailable, keeping {len(rows)} trip locations queued: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Trip locations rejected, writing {len(rows)} rows one by one: {e}")
+            self.failed_flushes += 1
+            try:
+                await self._write_each(rows)
+            except OperationalError as e:
+                logger.error(f"Database unavailable, keeping {len(rows)} trip locations queued: {e}")
+                return False
+            except Exception as e:
+                self._retry_or_drop(rows, attempts, e)
+            return True
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushed_rows += len(rows)
+        self.flush_count += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+        return True
+
+    def _retry_or_drop(self, rows: List[Dict[str, Any]], attempts: int, error: Exception):
+        if attempts + 1 >= self.max_attempts:
+            logger.error(f"Dropping {len(rows)} trip locations after {attempts + 1} failed flushes: {error}")
+            self.dropped_rows += len(rows)
+        else:
+            logger.error(f"Error flushing {len(rows)} trip locations (attempt {attempts + 1}): {error}")
+            self._requeue(rows, attempts + 1)
+
+    def _requeue(self, rows: List[Dict[str, Any]], attempts: int):
+        self._retry.append((rows, attempts))
+        self._retry_rows += len(rows)
+
+    async def _write_each(self, rows: List[Dict[str, Any]]):
+        rejected = 0
+        async with telemetry_session() as db:
+            for row in rows:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(insert(TripLocation), [row])
+                except (IntegrityError, DataError) as e:
+                    logger.error(f"Dropping trip location of trip {row.get('trip_id')}: {e}")
+                    rejected += 1
+            await db.commit()
+        self.flushed_rows += len(rows) - rejected
+        self.dropped_rows += rejected
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Location flush loop error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_pending": self.max_pending,
+            "flushed_rows": self.flushed_rows,
+            "flush_count": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+            "retry_batches": len(self._retry),
+            "dropped_rows": self.dropped_rows,
+            "backpressure_waits": self.backpressure_waits,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flush_count, 3) if self.flush_count else 0.0,
+        }
+
+
+location_buffer = LocationWriteBuffer(
+    flush_rows=settings.location_flush_rows,
+    flush_interval=settings.location_flush_interval_ms / 1000,
+    max_pending=settings.location_buffer_max_rows,
+    max_attempts=settings.location_flush_max_attempts,
+)
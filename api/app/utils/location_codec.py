@@ -0,0 +1,152 @@
+"""
+Compact encodings for trip paths.
+
+Polyline: Google encoded polyline (precision 5) per participant.
+
+Columnar (little-endian), rows grouped by participant and ordered by time:
+    b"VMTL" | u8 version | u8 reserved | u16 ts_unit_ms | i64 base_ts_ms | u32 n_points
+    u16 n_users, then per user: u8 length + utf-8 user id
+    u16[n] user index | i32[n] delta lat E6 | i32[n] delta lng E6
+    i32[n] delta timestamp (ts_unit_ms) | u16[n] accuracy in decimeters
+Deltas are taken against the previous row (the first row against 0 / base_ts_ms).
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+import struct
+import numpy as np
+from app.utils.geo import location_field
+
+POLYLINE_MEDIA_TYPE = "application/vnd.vmaps.polyline+json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.vmaps.locations"
+
+COLUMNAR_MAGIC = b"VMTL"
+COLUMNAR_VERSION = 1
+COORD_SCALE = 1e6
+_HEADER = struct.Struct("<4sBBHqI")
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+def encode_polyline(lats: List[float], lngs: List[float], precision: int = 5) -> str:
+    """Google encoded polyline algorithm."""
+    if not len(lats):
+        return ""
+    scale = 10 ** precision
+    coords = np.column_stack((
+        np.round(np.asarray(lats, dtype=np.float64) * scale),
+        np.round(np.asarray(lngs, dtype=np.float64) * scale),
+    )).astype(np.int64)
+    deltas = np.diff(coords, axis=0, prepend=[[0, 0]]).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    chars = []
+    for value in values.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return "".join(chars)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[tuple[float, float]]:
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    coords = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return [(float(lat), float(lng)) for lat, lng in coords]
+
+
+def _timestamp_ms(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def encode_polylines(paths: Dict[str, List[Any]]) -> Dict[str, Dict[str, Any]]:
+    """One encoded polyline per participant (paths from geo.group_by_user), with the time span it covers."""
+    return {
+        user_id: {
+            "polyline": encode_polyline(
+                [location_field(l, "latitude") for l in path], [location_field(l, "longitude") for l in path]
+            ),
+            "points": len(path),
+            "started_at": location_field(path[0], "recorded_at").isoformat(),
+            "ended_at": location_field(path[-1], "recorded_at").isoformat(),
+        }
+        for user_id, path in paths.items()
+    }
+
+
+def encode_columnar(locations: List[Any]) -> bytes:
+    rows = sorted(locations, key=lambda l: (location_field(l, "user_id"), location_field(l, "recorded_at")))
+    users = list(dict.fromkeys(location_field(l, "user_id") for l in rows))
+    user_index = {user_id: i for i, user_id in enumerate(users)}
+    n = len(rows)
+
+    idx = np.fromiter((user_index[location_field(l, "user_id")] for l in rows), dtype=np.uint16, count=n)
+    lat = np.round(np.fromiter((location_field(l, "latitude") for l in rows), dtype=np.float64, count=n) * COORD_SCALE).astype(np.int64)
+    lng = np.round(np.fromiter((location_field(l, "longitude") for l in rows), dtype=np.float64, count=n) * COORD_SCALE).astype(np.int64)
+    ts = np.fromiter((_timestamp_ms(location_field(l, "recorded_at")) for l in rows), dtype=np.int64, count=n)
+    accuracy = np.fromiter((location_field(l, "accuracy") or 0.0 for l in rows), dtype=np.float64, count=n)
+
+    base_ts = int(ts.min()) if n else 0
+    ts_unit = 1
+    dts = np.diff(ts, prepend=base_ts)
+    if n and np.abs(dts).max() > _INT32_MAX:
+        # Very long gaps between participants: fall back to second resolution
+        ts_unit = 1000
+        dts = np.diff(ts // ts_unit, prepend=base_ts // ts_unit)
+
+    parts = [_HEADER.pack(COLUMNAR_MAGIC, COLUMNAR_VERSION, 0, ts_unit, base_ts, n)]
+    parts.append(struct.pack("<H", len(users)))
+    for user_id in users:
+        encoded = user_id.encode()
+        parts.append(struct.pack("<B", len(encoded)) + encoded)
+    parts.append(idx.astype("<u2").tobytes())
+    parts.append(np.diff(lat, prepend=0).astype("<i4").tobytes())
+    parts.append(np.diff(lng, prepend=0).astype("<i4").tobytes())
+    parts.append(dts.astype("<i4").tobytes())
+    parts.append(np.clip(np.round(accuracy * 10), 0, 65535).astype("<u2").tobytes())
+    return b"".join(parts)
+
+
+def decode_columnar(data: bytes) -> List[Dict[str, Any]]:
+    magic, version, _, ts_unit, base_ts, n = _HEADER.unpack_from(data, 0)
+    if magic != COLUMNAR_MAGIC or version != COLUMNAR_VERSION:
+        raise ValueError("Not a columnar location payload")
+    offset = _HEADER.size
+    (n_users,) = struct.unpack_from("<H", data, offset)
+    offset += 2
+    users = []
+    for _ in range(n_users):
+        length = data[offset]
+        users.append(data[offset + 1:offset + 1 + length].decode())
+        offset += 1 + length
+
+    def column(dtype: str) -> np.ndarray:
+        nonlocal offset
+        values = np.frombuffer(data, dtype=dtype, count=n, offset=offset)
+        offset += values.nbytes
+        return values
+
+    idx = column("<u2")
+    lat = np.cumsum(column("<i4").astype(np.int64)) / COORD_SCALE
+    lng = np.cumsum(column("<i4").astype(np.int64)) / COORD_SCALE
+    ts = (base_ts // ts_unit + np.cumsum(column("<i4").astype(np.int64))) * ts_unit
+    accuracy = column("<u2") / 10
+
+    return [
+        {
+            "user_id": users[i],
+            "latitude": float(la),
+            "longitude": float(lo),
+            "accuracy": float(acc),
+            "recorded_at": datetime.fromtimestamp(t / 1000, tz=timezone.utc).replace(tzinfo=None),
+        }
+        for i, la, lo, t, acc in zip(idx.tolist(), lat.tolist(), lng.tolist(), ts.tolist(), accuracy.tolist())
+    ]
@@ -0,0 +1,127 @@
+from typing import Any, Dict, List, Tuple
+from app.config import settings
+from app.utils.geo import haversine_m
+
+
+class LocationIngestFilter:
+    """
+    Drops redundant fixes before they are stored or broadcast:
+    - accuracy worse than max_accuracy_m (0 disables);
+    - less than min_interval_s after the participant's last stored fix;
+    - moved less than max(min_distance_m, accuracy / 2) since the last stored fix,
+      unless keepalive_s have passed (stationary phones still report now and then).
+    With smoothing, kept fixes go through a small accuracy-weighted Kalman filter.
+    """
+
+    def __init__(
+        self,
+        min_distance_m: float,
+        min_interval_s: float,
+        keepalive_s: float,
+        max_accuracy_m: float,
+        smoothing: bool,
+        process_noise_mps: float,
+    ):
+        self.min_distance_m = min_distance_m
+        self.min_interval_s = min_interval_s
+        self.keepalive_s = keepalive_s
+        self.max_accuracy_m = max_accuracy_m
+        self.smoothing = smoothing
+        self.process_noise_mps = process_noise_mps
+        # (trip_id, user_id) -> last stored fix and its variance
+        self._last: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.counters = {
+            "kept": 0,
+            "dropped_accuracy": 0,
+            "dropped_interval": 0,
+            "dropped_distance": 0,
+        }
+
+    def apply(self, trip_id: str, user_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Filter (and optionally smooth) rows ordered by recorded_at; returns the rows to keep."""
+        kept = []
+        for row in rows:
+            reason = self._drop_reason(trip_id, user_id, row)
+            if reason:
+                self.counters[reason] += 1
+                continue
+            self._remember(trip_id, user_id, row)
+            self.counters["kept"] += 1
+            kept.append(row)
+        return kept
+
+    def _drop_reason(self, trip_id: str, user_id: str, row: Dict[str, Any]) -> str | None:
+        accuracy = row["accuracy"] or 0.0
+        if self.max_accuracy_m and accuracy > self.max_accuracy_m:
+            return "dropped_accuracy"
+
+        last = self._last.get((trip_id, user_id))
+        if last is None:
+            return None
+        elapsed = (row["recorded_at"] - last["recorded_at"]).total_seconds()
+        if elapsed < 0:
+            # Late fix from a backfilled batch: keep it, it does not move the reference point
+            return None
+        if elapsed < self.min_interval_s:
+            return "dropped_interval"
+
+        distance = haversine_m(last["latitude"], last["longitude"], row["latitude"], row["longitude"])
+        if distance < max(self.min_distance_m, accuracy / 2) and elapsed < self.keepalive_s:
+            return "dropped_distance"
+        return None
+
+    def _remember(self, trip_id: str, user_id: str, row: Dict[str, Any]):
+        key = (trip_id, user_id)
+        last = self._last.get(key)
+        if last is not None and row["recorded_at"] < last["recorded_at"]:
+            return
+
+        accuracy = max(row["accuracy"] or 0.0, 1.0)
+        variance = accuracy ** 2
+        if self.smoothing and last is not None:
+            elapsed = (row["recorded_at"] - last["recorded_at"]).total_seconds()
+            predicted = last["variance"] + (elapsed * self.process_noise_mps) ** 2
+            gain = predicted / (predicted + accuracy ** 2)
+            row["latitude"] = last["latitude"] + gain * (row["latitude"] - last["latitude"])
+            row["longitude"] = last["longitude"] + gain * (row["longitude"] - last["longitude"])
+            variance = (1 - gain) * predicted
+
+        self._last[key] = {
+            "latitude": row["latitude"],
+            "longitude": row["longitude"],
+            "recorded_at": row["recorded_at"],
+            "variance": variance,
+        }
+
+    def reference(self, trip_id: str, user_id: str) -> Dict[str, Any] | None:
+        """The participant's last stored fix, as other workers need it (see sync)."""
+        last = self._last.get((trip_id, user_id))
+        return dict(last) if last is not None else None
+
+    def sync(self, trip_id: str, user_id: str, reference: Dict[str, Any]):
+        """Adopt the reference point another worker stored for the participant, if newer."""
+        key = (trip_id, user_id)
+        last = self._last.get(key)
+        if last is None or last["recorded_at"] <= reference["recorded_at"]:
+            self._last[key] = dict(reference)
+
+    def remove_participant(self, trip_id: str, user_id: str):
+        self._last.pop((trip_id, user_id), None)
+
+    def clear(self, trip_id: str):
+        for key in [key for key in self._last if key[0] == trip_id]:
+            del self._last[key]
+
+    def stats(self) -> Dict[str, Any]:
+        dropped = sum(v for k, v in self.counters.items() if k.startswith("dropped"))
+        return {**self.counters, "dropped": dropped, "tracked_participants": len(self._last)}
+
+
+location_filter = LocationIngestFilter(
+    min_distance_m=settings.location_filter_min_distance_m,
+    min_interval_s=settings.location_filter_min_interval_s,
+    keepalive_s=settings.location_filter_keepalive_s,
+    max_accuracy_m=settings.location_filter_max_accuracy_m,
+    smoothing=settings.location_filter_smoothing,
+    process_noise_mps=settings.location_filter_process_noise_mps,
+)
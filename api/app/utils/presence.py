@@ -0,0 +1,199 @@
+"""
+Who is online, built on ConnectionManager: a user is online while they have at least
+one socket on any worker. Every worker keeps the full picture in memory:
+- its own users come from the manager's connection listener;
+- other workers' users arrive as "presence" backplane envelopes (an update on each
+  transition plus a periodic snapshot, so a worker that dies expires after 3 missed syncs).
+
+Friends get a presence_changed event once a user's state has held for debounce_s, so
+a phone flapping between networks does not produce a burst of online/offline pushes.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Set
+import asyncio
+import logging
+import time
+from app.config import settings
+from app.database import async_session
+from app.utils.websockets import ConnectionManager, manager
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceService:
+    def __init__(self, manager: ConnectionManager, debounce_s: float, sync_s: float):
+        self.manager = manager
+        self.debounce_s = debounce_s
+        self.sync_s = sync_s
+        self.worker_id = manager.backplane.worker_id
+        self._remote: Dict[str, Set[str]] = {}  # user_id -> other workers where the user is online
+        self._worker_users: Dict[str, Set[str]] = {}  # worker_id -> its online users
+        self._worker_seen: Dict[str, float] = {}
+        self._last_seen: Dict[str, float] = {}  # user_id -> epoch seconds of the last disconnect
+        self._announced: Dict[str, bool] = {}  # last state pushed to friends
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+        self.counters = {"transitions": 0, "announced": 0, "suppressed": 0}
+        manager.add_connection_listener(self._on_local_change)
+        manager.register_op("presence", self._on_envelope)
+
+    def start(self):
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+
+    # Lookups
+
+    def is_online(self, user_id: str) -> bool:
+        return user_id in self.manager.active_connections or bool(self._remote.get(user_id))
+
+    def last_seen(self, user_id: str) -> Optional[datetime]:
+        """Now for online users; the last disconnect seen since startup otherwise (None if unknown)."""
+        if self.is_online(user_id):
+            return datetime.now(timezone.utc)
+        seen = self._last_seen.get(user_id)
+        return datetime.fromtimestamp(seen, tz=timezone.utc) if seen is not None else None
+
+    def lookup(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        return {
+            user_id: {"is_online": self.is_online(user_id), "last_seen_at": self.last_seen(user_id)}
+            for user_id in user_ids
+        }
+
+    # Transitions
+
+    def _on_local_change(self, user_id: str, online: bool):
+        self.counters["transitions"] += 1
+        if not online:
+            self._last_seen[user_id] = time.time()
+        asyncio.create_task(self.manager.backplane.publish({
+            "op": "presence", "kind": "update", "worker_id": self.worker_id,
+            "user_id": user_id, "online": online, "at": time.time(),
+        }))
+        self._schedule(user_id)
+
+    def _schedule(self, user_id: str):
+        timer = self._timers.pop(user_id, None)
+        if timer is not None:
+            timer.cancel()
+            self.counters["suppressed"] += 1
+        loop = asyncio.get_running_loop()
+        self._timers[user_id] = loop.call_later(
+            self.debounce_s, lambda: asyncio.create_task(self._announce(user_id))
+        )
+
+    async def _announce(self, user_id: str):
+        self._timers.pop(user_id, None)
+        online = self.is_online(user_id)
+        if self._announced.get(user_id, False) == online:
+            return
+        self._announced[user_id] = online
+        self.counters["announced"] += 1
+        try:
+            await self.manager.backplane.publish({
+                "op": "presence", "kind": "announced", "worker_id": self.worker_id,
+                "user_id": user_id, "online": online,
+            })
+            last_seen_at = self.last_seen(user_id)
+            async with async_session() as db:
+                await self.manager.broadcast_to_friends(user_id, {
+                    "type": "presence_changed",
+                    "user_id": user_id,
+                    "is_online": online,
+                    "last_seen_at": last_seen_at.isoformat() if last_seen_at else None,
+                }, db)
+        except Exception as e:
+            logger.error(f"Error announcing presence of user {user_id}: {e}")
+
+    # Other workers
+
+    async def _on_envelope(self, envelope: Dict[str, Any]):
+        worker_id = envelope["worker_id"]
+        if worker_id == self.worker_id:
+            return
+        kind = envelope["kind"]
+        if kind == "update":
+            self._worker_seen.setdefault(worker_id, time.time())
+            self._set_remote(worker_id, envelope["user_id"], envelope["online"], envelope["at"])
+        elif kind == "sync":
+            self._worker_seen[worker_id] = time.time()
+            users = set(envelope["user_ids"])
+            for user_id in self._worker_users.get(worker_id, set()) - users:
+                self._set_remote(worker_id, user_id, False, time.time())
+            for user_id in users:
+                self._set_remote(worker_id, user_id, True, time.time())
+        elif kind == "announced":
+            self._announced[envelope["user_id"]] = envelope["online"]
+
+    def _set_remote(self, worker_id: str, user_id: str, online: bool, at: float):
+        workers = self._remote.setdefault(user_id, set())
+        users = self._worker_users.setdefault(worker_id, set())
+        if online:
+            workers.add(worker_id)
+            users.add(user_id)
+        else:
+            if worker_id in workers:
+                self._last_seen[user_id] = max(at, self._last_seen.get(user_id, 0))
+            workers.discard(worker_id)
+            users.discard(user_id)
+        if not workers:
+            del self._remote[user_id]
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_s)
+            try:
+                await self.manager.backplane.publish({
+                    "op": "presence", "kind": "sync", "worker_id": self.worker_id,
+                    "user_ids": list(self.manager.active_connections),
+                })
+                self._expire_workers()
+            except Exception as e:
+                logger.error(f"Error syncing presence: {e}")
+
+    def _expire_workers(self):
+        """
+        Drop workers that missed 3 syncs. Their users went offline without a disconnect
+        being seen anywhere, so the surviving worker with the lowest id announces them.
+        """
+        expired = time.time() - 3 * self.sync_s
+        gone = set()
+        for worker_id, seen in list(self._worker_seen.items()):
+            if seen < expired:
+                for user_id in list(self._worker_users.get(worker_id, set())):
+                    self._set_remote(worker_id, user_id, False, seen)
+                    gone.add(user_id)
+                self._worker_users.pop(worker_id, None)
+                del self._worker_seen[worker_id]
+        if gone and self.worker_id == min([self.worker_id, *self._worker_seen]):
+            for user_id in gone:
+                if not self.is_online(user_id):
+                    self.counters["transitions"] += 1
+                    self._schedule(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "online_local": len(self.manager.active_connections),
+            "online_remote": len(self._remote),
+            "workers": len(self._worker_seen) + 1,
+            "pending_announcements": len(self._timers),
+        }
+
+
+presence = PresenceService(
+    manager,
+    debounce_s=settings.presence_debounce_s,
+    sync_s=settings.presence_sync_s,
+)
@@ -0,0 +1,198 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+import math
+from sqlalchemy import select
+from app.config import settings
+from app.database import async_session
+from app.models import Trip, Place
+from app.utils.geo import EARTH_RADIUS_M, haversine_m
+
+
+Cell = Tuple[int, int]
+
+
+class _TripGrid:
+    """Uniform grid over one trip's area; cells are cell_m wide around lat0."""
+
+    def __init__(self, lat0: float, cell_m: float):
+        self.cos_lat0 = math.cos(math.radians(lat0))
+        self.cell_m = cell_m
+        self.cells: Dict[Cell, Set[str]] = {}
+        self.positions: Dict[str, Tuple[float, float, Cell]] = {}  # user_id -> lat, lng, cell
+        self.near: Dict[str, Set[str]] = {}  # user_id -> participants currently nearby
+        # Geofences (reloaded when places_loaded is reset)
+        self.map_id: Optional[str] = None
+        self.places_loaded = False
+        self.places: Dict[str, Dict[str, Any]] = {}
+        self.place_cells: Dict[Cell, Set[str]] = {}
+        self.inside: Dict[str, Set[str]] = {}  # user_id -> place ids
+
+    def cell(self, lat: float, lng: float) -> Cell:
+        x = math.radians(lng) * self.cos_lat0 * EARTH_RADIUS_M
+        y = math.radians(lat) * EARTH_RADIUS_M
+        return int(math.floor(x / self.cell_m)), int(math.floor(y / self.cell_m))
+
+    def neighbours(self, cells: Dict[Cell, Set[str]], cell: Cell) -> Set[str]:
+        found: Set[str] = set()
+        cx, cy = cell
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                found |= cells.get((cx + dx, cy + dy), set())
+        return found
+
+
+class ProximityTracker:
+    """
+    Latest position of each participant of active trips in a per-trip spatial grid.
+    Each fix is only compared with participants (and the map's places) in the
+    neighbouring cells; the cell size is the separation distance, so nothing
+    farther away can cross a threshold.
+
+    Hysteresis: a pair becomes nearby at <= near_m and separated at > far_m;
+    a participant enters a place at <= geofence_radius_m and exits at > geofence_exit_m.
+    """
+
+    def __init__(
+        self,
+        near_m: float,
+        far_m: float,
+        geofence_enabled: bool,
+        geofence_radius_m: float,
+        geofence_exit_m: float,
+    ):
+        self.near_m = near_m
+        self.far_m = max(far_m, near_m)
+        self.geofence_enabled = geofence_enabled
+        self.geofence_radius_m = geofence_radius_m
+        self.geofence_exit_m = max(geofence_exit_m, geofence_radius_m)
+        self._trips: Dict[str, _TripGrid] = {}
+        self.counters = {"updates": 0, "distance_checks": 0, "events": 0}
+
+    async def update(self, trip_id: str, user_id: str, latitude: float, longitude: float) -> List[Dict[str, Any]]:
+        """Move the participant in the grid and return the threshold crossings as events."""
+        grid = self._trips.get(trip_id)
+        if grid is None:
+            grid = _TripGrid(latitude, max(self.far_m, self.geofence_exit_m if self.geofence_enabled else 0))
+            self._trips[trip_id] = grid
+        if self.geofence_enabled and not grid.places_loaded:
+            await self._load_places(trip_id, grid)
+        self.counters["updates"] += 1
+
+        cell = grid.cell(latitude, longitude)
+        previous = grid.positions.get(user_id)
+        if previous is not None and previous[2] != cell:
+            grid.cells[previous[2]].discard(user_id)
+        grid.cells.setdefault(cell, set()).add(user_id)
+        grid.positions[user_id] = (latitude, longitude, cell)
+
+        events = self._participant_events(trip_id, grid, user_id, latitude, longitude, cell)
+        if self.geofence_enabled:
+            events += self._geofence_events(trip_id, grid, user_id, latitude, longitude, cell)
+        self.counters["events"] += len(events)
+        return events
+
+    def _participant_events(self, trip_id, grid: _TripGrid, user_id, latitude, longitude, cell) -> List[Dict[str, Any]]:
+        events = []
+        near = grid.near.setdefault(user_id, set())
+        candidates = grid.neighbours(grid.cells, cell) | near
+        candidates.discard(user_id)
+        for other_id in candidates:
+            other_lat, other_lng, _ = grid.positions[other_id]
+            self.counters["distance_checks"] += 1
+            distance = haversine_m(latitude, longitude, other_lat, other_lng)
+            if other_id not in near and distance <= self.near_m:
+                near.add(other_id)
+                grid.near.setdefault(other_id, set()).add(user_id)
+                events.append(self._pair_event("participant_nearby", trip_id, user_id, other_id, distance))
+            elif other_id in near and distance > self.far_m:
+                near.discard(other_id)
+                grid.near.get(other_id, set()).discard(user_id)
+                events.append(self._pair_event("participant_separated", trip_id, user_id, other_id, distance))
+        return events
+
+    def _geofence_events(self, trip_id, grid: _TripGrid, user_id, latitude, longitude, cell) -> List[Dict[str, Any]]:
+        events = []
+        inside = grid.inside.setdefault(user_id, set())
+        for place_id in grid.neighbours(grid.place_cells, cell) | inside:
+            place = grid.places.get(place_id)
+            if place is None:
+                inside.discard(place_id)
+                continue
+            self.counters["distance_checks"] += 1
+            distance = haversine_m(latitude, longitude, place["lat"], place["lng"])
+            if place_id not in inside and distance <= self.geofence_radius_m:
+                inside.add(place_id)
+                events.append(self._place_event("geofence_enter", trip_id, user_id, place, distance))
+            elif place_id in inside and distance > self.geofence_exit_m:
+                inside.discard(place_id)
+                events.append(self._place_event("geofence_exit", trip_id, user_id, place, distance))
+        return events
+
+    async def _load_places(self, trip_id: str, grid: _TripGrid):
+        async with async_session() as db:
+            if grid.map_id is None:
+                grid.map_id = await db.scalar(select(Trip.map_id).where(Trip.id == trip_id))
+            result = await db.execute(
+                select(Place.id, Place.name, Place.lat, Place.lng).where(Place.map_id == grid.map_id)
+            )
+            rows = result.mappings().all()
+        grid.places = {row["id"]: dict(row) for row in rows}
+        grid.place_cells = {}
+        grid.places_loaded = True
+        for place in grid.places.values():
+            grid.place_cells.setdefault(grid.cell(place["lat"], place["lng"]), set()).add(place["id"])
+
+    @staticmethod
+    def _pair_event(event_type: str, trip_id: str, user_id: str, other_id: str, distance: float) -> Dict[str, Any]:
+        return {
+            "type": event_type,
+            "trip_id": trip_id,
+            "user_ids": [user_id, other_id],
+            "distance_m": round(distance, 1),
+        }
+
+    @staticmethod
+    def _place_event(event_type: str, trip_id: str, user_id: str, place: Dict[str, Any], distance: float) -> Dict[str, Any]:
+        return {
+            "type": event_type,
+            "trip_id": trip_id,
+            "user_id": user_id,
+            "place_id": place["id"],
+            "place_name": place["name"],
+            "distance_m": round(distance, 1),
+        }
+
+    def remove_participant(self, trip_id: str, user_id: str):
+        grid = self._trips.get(trip_id)
+        if grid is None:
+            return
+        position = grid.positions.pop(user_id, None)
+        if position is not None:
+            grid.cells.get(position[2], set()).discard(user_id)
+        for other_id in grid.near.pop(user_id, set()):
+            grid.near.get(other_id, set()).discard(user_id)
+        grid.inside.pop(user_id, None)
+
+    def clear(self, trip_id: str):
+        self._trips.pop(trip_id, None)
+
+    def invalidate_places(self, map_id: str):
+        """Places of a map changed: its trips reload them on their next fix."""
+        for grid in self._trips.values():
+            if grid.map_id == map_id:
+                grid.places_loaded = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "tracked_trips": len(self._trips),
+            "tracked_participants": sum(len(grid.positions) for grid in self._trips.values()),
+        }
+
+
+proximity = ProximityTracker(
+    near_m=settings.proximity_near_m,
+    far_m=settings.proximity_far_m,
+    geofence_enabled=settings.proximity_geofence_enabled,
+    geofence_radius_m=settings.proximity_geofence_radius_m,
+    geofence_exit_m=settings.proximity_geofence_exit_m,
+)
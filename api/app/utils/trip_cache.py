@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.config import settings
+from app.models import Trip
+from app.utils.cache import TTLCache
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Positions are kept as naive UTC, the way they are read back from the database."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class _LoadGuard:
+    """
+    Cache fills that await the database must not write back a result that an
+    invalidation made stale meanwhile: each load takes a token, invalidate() revokes
+    the trip's token, and the result is only stored if the token is still current.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, object] = {}
+
+    def begin(self, trip_id: str) -> object:
+        token = object()
+        self._tokens[trip_id] = token
+        return token
+
+    def finish(self, trip_id: str, token: object) -> bool:
+        """True if the load may be stored."""
+        if self._tokens.get(trip_id) is not token:
+            return False
+        del self._tokens[trip_id]
+        return True
+
+    def revoke(self, trip_id: str):
+        self._tokens.pop(trip_id, None)
+
+
+class LivePositionCache:
+    """
+    Latest fix of each participant of active trips, keyed by trip id then user id.
+    Trips are loaded lazily from the database on a miss; updates for trips that
+    are not cached are ignored since the next read rebuilds them anyway.
+    Bounded LRU; entries also expire after ttl_s and are then reloaded.
+    """
+
+    def __init__(self, max_trips: int, ttl_s: float):
+        self._positions = TTLCache(max_trips, ttl_s)
+        self._loads = _LoadGuard()
+
+    def update(self, trip_id: str, user_id: str, position: Dict[str, Any]):
+        positions = self._positions.get(trip_id)
+        if positions is None:
+            return
+        recorded_at = _naive_utc(position["recorded_at"])
+        current = positions.get(user_id)
+        if current is None or current["recorded_at"] <= recorded_at:
+            positions[user_id] = {
+                "user_id": user_id,
+                "latitude": position["latitude"],
+                "longitude": position["longitude"],
+                "accuracy": position["accuracy"],
+                "recorded_at": recorded_at,
+            }
+
+    def remove_participant(self, trip_id: str, user_id: str):
+        self._loads.revoke(trip_id)
+        (self._positions.get(trip_id) or {}).pop(user_id, None)
+
+    def clear(self, trip_id: str):
+        self._loads.revoke(trip_id)
+        self._positions.invalidate(trip_id)
+
+    async def get(self, db: AsyncSession, trip_id: str, is_active: bool = True) -> List[Dict[str, Any]]:
+        positions = self._positions.get(trip_id)
+        if positions is None:
+            from app.utils.location_buffer import location_buffer
+            from app.utils.trip_locations import path_summaries
+
+            token = self._loads.begin(trip_id)
+            await location_buffer.flush_trip(trip_id)
+            summary = (await path_summaries(db, [trip_id])).get(trip_id, {})
+            positions = {p["user_id"]: p for p in summary.get("last_positions", [])}
+            if self._loads.finish(trip_id, token) and is_active:
+                self._positions.set(trip_id, positions)
+        return list(positions.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return self._positions.stats()
+
+    @staticmethod
+    def serialize(positions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [{**p, "recorded_at": p["recorded_at"].isoformat()} for p in positions]
+
+
+@dataclass
+class TripRoster:
+    trip_id: str
+    map_id: str
+    created_by: str
+    is_active: bool
+    statuses: Dict[str, str]  # user_id -> participant status
+
+    @property
+    def participant_ids(self) -> List[str]:
+        return list(self.statuses)
+
+
+class TripRosterCache:
+    """
+    Participants, their statuses and the active flag of active trips, keyed by trip id.
+    Must be invalidated by every endpoint that changes a trip's participants or status.
+    Bounded LRU; entries also expire after ttl_s as a backstop for a missed invalidation.
+    """
+
+    def __init__(self, max_trips: int, ttl_s: float):
+        self._rosters = TTLCache(max_trips, ttl_s)
+        self._loads = _LoadGuard()
+
+    async def get(self, db: AsyncSession, trip_id: str) -> Optional[TripRoster]:
+        roster = self._rosters.get(trip_id)
+        if roster is None:
+            token = self._loads.begin(trip_id)
+            result = await db.execute(
+                select(Trip)
+                .where(Trip.id == trip_id)
+                .options(selectinload(Trip.participants))
+            )
+            trip = result.scalars().first()
+            if trip is None:
+                return None
+            roster = TripRoster(
+                trip_id=trip.id,
+                map_id=trip.map_id,
+                created_by=trip.created_by,
+                is_active=trip.is_active,
+                statuses={p.user_id: p.status for p in trip.participants},
+            )
+            if self._loads.finish(trip_id, token) and trip.is_active:
+                self._rosters.set(trip_id, roster)
+        return roster
+
+    def invalidate(self, trip_id: str):
+        self._loads.revoke(trip_id)
+        self._rosters.invalidate(trip_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._rosters.stats()
+
+
+live_positions = LivePositionCache(settings.trip_cache_size, settings.trip_cache_ttl_s)
+roster_cache = TripRosterCache(settings.trip_cache_size, settings.trip_cache_ttl_s)
@@ -0,0 +1,363 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+import base64
+import json
+import uuid
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import select, insert, func, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import async_session
+from app.models import TripLocation
+from app.schemas.trip import LocationUpdate, LocationBatch
+from app.utils.location_archive import archived_locations
+from app.utils.location_buffer import location_buffer
+from app.utils.location_filter import location_filter
+from app.utils.proximity import proximity
+from app.utils.trip_cache import live_positions, roster_cache
+from app.utils.websockets import manager
+
+
+async def get_location_participants(db: AsyncSession, trip_id: str, user_id: str) -> List[str]:
+    """
+    Check that the user may share location in the trip.
+    Returns the participant ids used for the location fan-out; reads the cached roster.
+    """
+    roster = await roster_cache.get(db, trip_id)
+
+    if not roster or not roster.is_active:
+        raise HTTPException(status_code=400, detail="Trip not active")
+
+    status = roster.statuses.get(user_id)
+
+    if status is None:
+        raise HTTPException(status_code=403, detail="Not a participant")
+
+    if status != 'accepted':
+        raise HTTPException(status_code=403, detail="You must accept the trip invitation to share location")
+
+    return roster.participant_ids
+
+
+def _normalize_recorded_at(recorded_at: datetime | None, now: datetime) -> datetime:
+    """Client timestamps are stored in UTC and never in the future."""
+    if recorded_at is None:
+        return now
+    if recorded_at.tzinfo is None:
+        recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+    else:
+        recorded_at = recorded_at.astimezone(timezone.utc)
+    return min(recorded_at, now)
+
+
+async def record_locations(
+    db: AsyncSession,
+    trip_id: str,
+    user_id: str,
+    fixes: List[LocationUpdate],
+) -> List[Dict[str, Any]]:
+    """
+    Persist fixes ordered by recorded_at and return the rows kept by the ingest filter.
+    With location_write_behind the rows are queued for a group commit; otherwise they are
+    inserted in a single statement and transaction.
+    """
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "trip_id": trip_id,
+            "user_id": user_id,
+            "latitude": fix.latitude,
+            "longitude": fix.longitude,
+            "accuracy": fix.accuracy,
+            "recorded_at": _normalize_recorded_at(getattr(fix, "recorded_at", None), now),
+        }
+        for fix in fixes
+    ]
+    rows.sort(key=lambda row: row["recorded_at"])
+
+    if settings.location_filter_enabled:
+        rows = location_filter.apply(trip_id, user_id, rows)
+        if not rows:
+            return rows
+
+    if settings.location_write_behind:
+        await location_buffer.enqueue(rows)
+    else:
+        await db.execute(insert(TripLocation), rows)
+        await db.commit()
+
+    live_positions.update(trip_id, user_id, rows[-1])
+    reference = location_filter.reference(trip_id, user_id) if settings.location_filter_enabled else None
+    await manager.share_trip_fix(trip_id, user_id, rows[-1], reference)
+    return rows
+
+
+async def broadcast_locations(
+    participant_ids: List[str],
+    trip_id: str,
+    user_id: str,
+    rows: List[Dict[str, Any]],
+):
+    """
+    Emit one location_updated event for the latest fix; batches also carry their points.
+    Proximity and geofence crossings caused by the fix follow as their own events.
+    """
+    if not rows:
+        return
+    latest = rows[-1]
+    data = {
+        "trip_id": trip_id,
+        "user_id": user_id,
+        "latitude": latest["latitude"],
+        "longitude": latest["longitude"],
+        "accuracy": latest["accuracy"],
+        "recorded_at": latest["recorded_at"].isoformat(),
+    }
+    if len(rows) > 1:
+        data["points"] = [
+            {
+                "latitude": row["latitude"],
+                "longitude": row["longitude"],
+                "accuracy": row["accuracy"],
+                "recorded_at": row["recorded_at"].isoformat(),
+            }
+            for row in rows
+        ]
+    await manager.broadcast_trip_event(participant_ids, "location_updated", data)
+
+    if settings.proximity_enabled:
+        events = await proximity.update(trip_id, user_id, latest["latitude"], latest["longitude"])
+        for event in events:
+            await manager.broadcast(participant_ids, event)
+
+
+async def ingest_location_frame(user_id: str, msg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Handle a trip_location frame received on /users/ws and return the ack to send back.
+    Frames carry either a single fix or a "fixes" list; "ref" is echoed in the ack.
+    """
+    trip_id = msg.get("trip_id")
+    ack = {"type": "location_ack", "trip_id": trip_id, "ref": msg.get("ref")}
+
+    try:
+        fixes = LocationBatch.model_validate({"fixes": msg.get("fixes") or [msg]}).fixes
+    except ValidationError:
+        return {**ack, "type": "location_error", "detail": "Invalid location frame"}
+
+    if not trip_id:
+        return {**ack, "type": "location_error", "detail": "Invalid location frame"}
+
+    try:
+        async with async_session() as db:
+            participant_ids = await get_location_participants(db, trip_id, user_id)
+            rows = await record_locations(db, trip_id, user_id, fixes)
+    except HTTPException as e:
+        return {**ack, "type": "location_error", "detail": e.detail}
+
+    await broadcast_locations(participant_ids, trip_id, user_id, rows)
+    return {**ack, "count": len(rows), "dropped": len(fixes) - len(rows)}
+
+
+def encode_cursor(recorded_at: datetime, location_id: str) -> str:
+    """Opaque keyset cursor over (recorded_at, id)."""
+    raw = f"{recorded_at.isoformat()}|{location_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        recorded_at, location_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(recorded_at), location_id
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def locations_query(
+    trip_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> Select:
+    """Column select of a trip's locations ordered by (recorded_at, id)."""
+    stmt = (
+        select(
+            TripLocation.id,
+            TripLocation.user_id,
+            TripLocation.latitude,
+            TripLocation.longitude,
+            TripLocation.accuracy,
+            TripLocation.recorded_at,
+        )
+        .where(TripLocation.trip_id == trip_id)
+        .order_by(TripLocation.recorded_at.asc(), TripLocation.id.asc())
+    )
+    if since is not None:
+        stmt = stmt.where(TripLocation.recorded_at >= _as_utc(since))
+    if until is not None:
+        stmt = stmt.where(TripLocation.recorded_at < _as_utc(until))
+    if user_id is not None:
+        stmt = stmt.where(TripLocation.user_id == user_id)
+    if cursor is not None:
+        after_at, after_id = decode_cursor(cursor)
+        after_at = _as_utc(after_at)
+        stmt = stmt.where(
+            (TripLocation.recorded_at > after_at)
+            | ((TripLocation.recorded_at == after_at) & (TripLocation.id > after_id))
+        )
+    return stmt
+
+
+def filter_locations(
+    rows: List[Dict[str, Any]],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Same filters as locations_query, applied to rows already ordered by (recorded_at, id)."""
+    since, until = _as_utc(since), _as_utc(until)
+    after = None
+    if cursor is not None:
+        after_at, after_id = decode_cursor(cursor)
+        after = (_as_utc(after_at), after_id)
+    return [
+        row for row in rows
+        if (since is None or row["recorded_at"] >= since)
+        and (until is None or row["recorded_at"] < until)
+        and (user_id is None or row["user_id"] == user_id)
+        and (after is None or (row["recorded_at"], row["id"]) > after)
+    ]
+
+
+async def load_locations(db: AsyncSession, trip_id: str) -> List[Dict[str, Any]]:
+    """Every location of a trip ordered by (recorded_at, id), from its archive if it has one."""
+    archived = (await archived_locations(db, [trip_id])).get(trip_id)
+    if archived is not None:
+        return archived
+    result = await db.execute(locations_query(trip_id))
+    return [dict(row) for row in result.mappings().all()]
+
+
+def _ndjson_line(row: Dict[str, Any]) -> str:
+    return json.dumps({**row, "recorded_at": row["recorded_at"].isoformat()}) + "\n"
+
+
+async def iter_locations_ndjson(rows: List[Dict[str, Any]], chunk_size: int = 1000) -> AsyncIterator[str]:
+    """NDJSON lines for rows already in memory (archived trips)."""
+    for start in range(0, len(rows), chunk_size):
+        yield "".join(_ndjson_line(row) for row in rows[start:start + chunk_size])
+
+
+async def stream_locations_ndjson(stmt: Select, chunk_size: int = 1000) -> AsyncIterator[str]:
+    """
+    Yield one JSON line per location, reading the rows in chunks.
+    Uses its own session because the response outlives the request's dependencies.
+    """
+    async with async_session() as db:
+        result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+        async for partition in result.mappings().partitions(chunk_size):
+            yield "".join(_ndjson_line(row) for row in partition)
+
+
+def path_stats_query(trip_ids: List[str]) -> Select:
+    """Point count and bounding box per trip."""
+    return (
+        select(
+            TripLocation.trip_id,
+            func.count(TripLocation.id),
+            func.min(TripLocation.latitude),
+            func.min(TripLocation.longitude),
+            func.max(TripLocation.latitude),
+            func.max(TripLocation.longitude),
+        )
+        .where(TripLocation.trip_id.in_(trip_ids))
+        .group_by(TripLocation.trip_id)
+    )
+
+
+def last_positions_query(trip_ids: List[str]) -> Select:
+    """Latest fix of each participant of each trip (ties on recorded_at return several rows)."""
+    latest = (
+        select(
+            TripLocation.trip_id,
+            TripLocation.user_id,
+            func.max(TripLocation.recorded_at).label("recorded_at"),
+        )
+        .where(TripLocation.trip_id.in_(trip_ids))
+        .group_by(TripLocation.trip_id, TripLocation.user_id)
+        .subquery()
+    )
+    return select(
+        TripLocation.trip_id,
+        TripLocation.user_id,
+        TripLocation.latitude,
+        TripLocation.longitude,
+        TripLocation.accuracy,
+        TripLocation.recorded_at,
+    ).join(
+        latest,
+        (TripLocation.trip_id == latest.c.trip_id)
+        & (TripLocation.user_id == latest.c.user_id)
+        & (TripLocation.recorded_at == latest.c.recorded_at),
+    )
+
+
+async def path_summaries(db: AsyncSession, trip_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Point count, bounding box and last position per participant for each trip, in two queries.
+    Archived trips are summarized from their unpacked blob.
+    """
+    if not trip_ids:
+        return {}
+
+    stats_result = await db.execute(path_stats_query(trip_ids))
+    summaries = {
+        trip_id: {
+            "point_count": count,
+            "min_latitude": min_lat,
+            "min_longitude": min_lng,
+            "max_latitude": max_lat,
+            "max_longitude": max_lng,
+            "last_positions": [],
+        }
+        for trip_id, count, min_lat, min_lng, max_lat, max_lng in stats_result.all()
+    }
+
+    last_result = await db.execute(last_positions_query(trip_ids))
+    seen = set()
+    for row in last_result.mappings().all():
+        # Several fixes may share the latest timestamp; keep one per participant
+        if (row["trip_id"], row["user_id"]) in seen:
+            continue
+        seen.add((row["trip_id"], row["user_id"]))
+        position = dict(row)
+        summaries[position.pop("trip_id")]["last_positions"].append(position)
+
+    missing = [trip_id for trip_id in trip_ids if trip_id not in summaries]
+    for trip_id, rows in (await archived_locations(db, missing)).items():
+        summaries[trip_id] = _summarize(rows)
+    return summaries
+
+
+def _summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """path_summaries entry computed from rows ordered by recorded_at."""
+    last_positions = {}
+    for row in rows:
+        last_positions[row["user_id"]] = {k: v for k, v in row.items() if k != "id"}
+    return {
+        "point_count": len(rows),
+        "min_latitude": min((r["latitude"] for r in rows), default=None),
+        "min_longitude": min((r["longitude"] for r in rows), default=None),
+        "max_latitude": max((r["latitude"] for r in rows), default=None),
+        "max_longitude": max((r["longitude"] for r in rows), default=None),
+        "last_positions": list(last_positions.values()),
+    }
@@ -0,0 +1,127 @@
+"""
+Server-side trip playback: every participant's position interpolated at fixed time steps.
+
+NDJSON output, a header line then one line per frame:
+    {"type": "replay", "trip_id", "frame_ms", "started_at", "frames", "participants": [user_id, ...]}
+    {"t": <ms since started_at>, "positions": {user_id: [lat, lng], ...}}
+A participant only appears in the frames between their first and last fix.
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import threading
+import numpy as np
+from app.config import settings
+
+
+def _timestamp_ms(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp() * 1000
+
+
+def frame_count(rows: List[Dict[str, Any]], frame_ms: int) -> int:
+    if not rows:
+        return 0
+    span = _timestamp_ms(rows[-1]["recorded_at"]) - _timestamp_ms(rows[0]["recorded_at"])
+    return int(span // frame_ms) + 1
+
+
+def build_frames(
+    rows: List[Dict[str, Any]], frame_ms: int
+) -> Tuple[float, np.ndarray, Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]]:
+    """
+    Interpolate each participant's path at t0 + k * frame_ms (rows ordered by recorded_at).
+    Returns t0 (ms), the frame times and, per user, (mask, lats, lngs) over those frames.
+    """
+    by_user: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_user.setdefault(row["user_id"], []).append(row)
+
+    t0 = _timestamp_ms(rows[0]["recorded_at"])
+    times = t0 + np.arange(frame_count(rows, frame_ms), dtype=np.float64) * frame_ms
+
+    paths = {}
+    for user_id, path in by_user.items():
+        ts = np.fromiter((_timestamp_ms(r["recorded_at"]) for r in path), dtype=np.float64, count=len(path))
+        lats = np.fromiter((r["latitude"] for r in path), dtype=np.float64, count=len(path))
+        lngs = np.fromiter((r["longitude"] for r in path), dtype=np.float64, count=len(path))
+        mask = (times >= ts[0]) & (times <= ts[-1])
+        paths[user_id] = (mask, np.interp(times, ts, lats), np.interp(times, ts, lngs))
+    return t0, times, paths
+
+
+def replay_ndjson(
+    trip_id: str, rows: List[Dict[str, Any]], frame_ms: int, chunk_frames: int = 500
+) -> Iterator[str]:
+    """Yield the replay as NDJSON chunks of chunk_frames lines."""
+    if not rows:
+        yield json.dumps({
+            "type": "replay", "trip_id": trip_id, "frame_ms": frame_ms,
+            "started_at": None, "frames": 0, "participants": [],
+        }) + "\n"
+        return
+
+    t0, times, paths = build_frames(rows, frame_ms)
+    started_at = datetime.fromtimestamp(t0 / 1000, tz=timezone.utc).replace(tzinfo=None)
+    yield json.dumps({
+        "type": "replay",
+        "trip_id": trip_id,
+        "frame_ms": frame_ms,
+        "started_at": started_at.isoformat(),
+        "frames": len(times),
+        "participants": list(paths),
+    }) + "\n"
+
+    for start in range(0, len(times), chunk_frames):
+        end = min(start + chunk_frames, len(times))
+        columns = [
+            (user_id, mask[start:end].tolist(), np.round(lats[start:end], 6).tolist(), np.round(lngs[start:end], 6).tolist())
+            for user_id, (mask, lats, lngs) in paths.items()
+        ]
+        lines = []
+        for i in range(end - start):
+            positions = {user_id: [la[i], lo[i]] for user_id, m, la, lo in columns if m[i]}
+            lines.append(json.dumps({"t": (start + i) * frame_ms, "positions": positions}))
+        yield "\n".join(lines) + "\n"
+
+
+class ReplayCache:
+    """
+    LRU of encoded replays of ended trips, keyed by (trip_id, frame_ms).
+    put() runs in the threadpool (at the end of a streamed replay) while get() runs on
+    the event loop, so every access to the entries holds the lock.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, trip_id: str, frame_ms: int) -> Optional[List[str]]:
+        with self._lock:
+            chunks = self._entries.get((trip_id, frame_ms))
+            if chunks is not None:
+                self._entries.move_to_end((trip_id, frame_ms))
+            return chunks
+
+    def put(self, trip_id: str, frame_ms: int, chunks: List[str]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(trip_id, frame_ms)] = chunks
+            self._entries.move_to_end((trip_id, frame_ms))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stream_and_store(self, trip_id: str, frame_ms: int, chunks: Iterator[str]) -> Iterator[str]:
+        """Pass chunks through, caching the whole replay once it has been produced."""
+        produced = []
+        for chunk in chunks:
+            produced.append(chunk)
+            yield chunk
+        self.put(trip_id, frame_ms, produced)
+
+
+replay_cache = ReplayCache(settings.trip_replay_cache_size)
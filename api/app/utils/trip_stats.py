@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Trip, TripStats
+from app.utils.geo import segment_distances, simplify_indices
+from app.utils.location_codec import encode_polyline, decode_polyline
+
+PREVIEW_MAX_POINTS = 20
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _participant_stats(user_id: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Distance, duration and speeds of one participant's path (rows ordered by time)."""
+    lats = np.fromiter((r["latitude"] for r in rows), dtype=np.float64, count=len(rows))
+    lngs = np.fromiter((r["longitude"] for r in rows), dtype=np.float64, count=len(rows))
+    seconds = np.fromiter((_as_utc(r["recorded_at"]).timestamp() for r in rows), dtype=np.float64, count=len(rows))
+
+    distances = segment_distances(lats, lngs)
+    elapsed = np.diff(seconds)
+    moving = elapsed > 0
+    speeds = distances[moving] / elapsed[moving]
+
+    distance = float(distances.sum())
+    duration = float(seconds[-1] - seconds[0]) if len(rows) > 1 else 0.0
+    last = rows[-1]
+    return {
+        "user_id": user_id,
+        "point_count": len(rows),
+        "distance_m": round(distance, 1),
+        "duration_seconds": duration,
+        "max_speed_mps": round(float(speeds.max()), 2) if len(speeds) else 0.0,
+        "avg_speed_mps": round(distance / duration, 2) if duration else 0.0,
+        "last_position": {
+            "user_id": user_id,
+            "latitude": last["latitude"],
+            "longitude": last["longitude"],
+            "accuracy": last["accuracy"],
+            "recorded_at": last["recorded_at"].isoformat(),
+        },
+    }
+
+
+async def compute_trip_stats(db: AsyncSession, trip: Trip) -> TripStats:
+    """
+    Compute (or recompute) the stored statistics and feed preview of a trip from its
+    locations. Pending buffered fixes are flushed first so the summary is complete.
+    """
+    from app.utils.location_buffer import location_buffer
+    from app.utils.trip_locations import load_locations
+
+    await location_buffer.flush_trip(trip.id)
+    rows = await load_locations(db, trip.id)
+
+    by_user: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_user.setdefault(row["user_id"], []).append(row)
+    participants = [_participant_stats(user_id, path) for user_id, path in by_user.items()]
+
+    stats = await db.get(TripStats, trip.id)
+    if stats is None:
+        stats = TripStats(trip_id=trip.id)
+        db.add(stats)
+
+    ended_at = trip.ended_at or (rows[-1]["recorded_at"] if rows else trip.started_at)
+    total_distance = sum(p["distance_m"] for p in participants)
+    moving_seconds = sum(p["duration_seconds"] for p in participants)
+    preview = simplify_indices(
+        [r["latitude"] for r in rows], [r["longitude"] for r in rows], max_points=PREVIEW_MAX_POINTS
+    )
+
+    stats.point_count = len(rows)
+    stats.duration_seconds = max((_as_utc(ended_at) - _as_utc(trip.started_at)).total_seconds(), 0.0)
+    stats.total_distance_m = round(total_distance, 1)
+    stats.max_speed_mps = max((p["max_speed_mps"] for p in participants), default=0.0)
+    stats.avg_speed_mps = round(total_distance / moving_seconds, 2) if moving_seconds else 0.0
+    stats.min_latitude = min((r["latitude"] for r in rows), default=None)
+    stats.min_longitude = min((r["longitude"] for r in rows), default=None)
+    stats.max_latitude = max((r["latitude"] for r in rows), default=None)
+    stats.max_longitude = max((r["longitude"] for r in rows), default=None)
+    stats.participants = participants
+    stats.preview_polyline = encode_polyline(
+        [rows[i]["latitude"] for i in preview], [rows[i]["longitude"] for i in preview]
+    )
+    stats.computed_at = datetime.now(timezone.utc)
+    await db.commit()
+    return stats
+
+
+def preview_points(stats: TripStats) -> List[Dict[str, float]]:
+    """Decoded feed preview as [{lat, lng}]."""
+    return [{"lat": lat, "lng": lng} for lat, lng in decode_polyline(stats.preview_polyline or "")]
+
+
+def stats_path_summary(stats: TripStats) -> Dict[str, Any]:
+    """Path summary (as returned by path_summaries) read from the stored statistics."""
+    return {
+        "point_count": stats.point_count,
+        "min_latitude": stats.min_latitude,
+        "min_longitude": stats.min_longitude,
+        "max_latitude": stats.max_latitude,
+        "max_longitude": stats.max_longitude,
+        "last_positions": [p["last_position"] for p in stats.participants or []],
+    }
@@ -1,38 +1,241 @@
 from fastapi import WebSocket
-from typing import Dict, List, Any, Set
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, List, Any, Optional, Set, Tuple
 import asyncio
 import logging
 import time
+import orjson
+from app.config import settings
+from app.utils.backplane import LocalBackplane, create_backplane
+from app.utils.friend_cache import friend_ids_cache, get_friend_ids
+from app.utils.location_filter import location_filter
+from app.utils.proximity import proximity
+from app.utils.trip_cache import live_positions, roster_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 HEARTBEAT_INTERVAL = 30
 HEARTBEAT_TIMEOUT = 10
+HEARTBEAT_TICK = 1  # seconds per timer-wheel slot
+
+# Frames superseded by the next one of the same kind: dropped first when an outbox is full
+DROPPABLE_TYPES = {"location_updated", "locations_batch", "ping"}
+
+# (message type, encoded JSON text): encoded once, shared by every socket it goes to
+Frame = Tuple[Optional[str], str]
+
+
+def encode_frame(message: Any) -> Frame:
+    message_type = message.get("type") if isinstance(message, dict) else None
+    return message_type, orjson.dumps(message).decode()
+
+
+PING_FRAME = encode_frame({"type": "ping"})
+
+
+def with_seq(frame: Frame, seq: int) -> Frame:
+    """Prefix an encoded JSON object with "seq" without serializing it again."""
+    message_type, text = frame
+    separator = "," if text != "{}" else ""
+    return message_type, f'{{"seq":{seq}{separator}{text[1:]}'
+
+
+class _ReplayLog:
+    """
+    Sequenced events of one user on this worker. stream identifies this log: a new
+    log (server restart, another worker, or the old one expired) gets a new stream.
+    """
+
+    def __init__(self, stream: str, size: int):
+        self.stream = stream
+        self.seq = 0
+        self.frames: Deque[Tuple[int, Frame]] = deque(maxlen=size)
+        self.expires_at: Optional[float] = None  # set while the user has no socket here
+
+
+class _Outbox:
+    """Bounded queue of outgoing frames for one socket, drained by its own writer task."""
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: Deque[Frame] = deque()
+        self.ready = asyncio.Event()
+        self.full_since: Optional[float] = None
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
 
 
 class ConnectionManager:
-    def __init__(self):
+    """
+    Sockets of this worker. Broadcasts go through the backplane so that, with several
+    workers, each one delivers the message to the sockets it holds.
+    """
+
+    def __init__(
+        self,
+        location_tick_ms: int = 0,
+        backplane: Optional[LocalBackplane] = None,
+        send_queue_size: int = 256,
+        send_timeout_s: float = 5.0,
+        slow_consumer_timeout_s: float = 10.0,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+        heartbeat_tick: float = HEARTBEAT_TICK,
+        replay_buffer_size: int = 200,
+        replay_ttl_s: float = 300.0,
+        replay_max_users: int = 10000,
+    ):
         self.active_connections: Dict[str, List[WebSocket]] = {}
         self._connection_activity: Dict[WebSocket, float] = {}
         self._connection_user: Dict[WebSocket, str] = {}
         self._rooms: Dict[str, Set[WebSocket]] = {}
         self._connection_rooms: Dict[WebSocket, Set[str]] = {}
-        self._friend_cache: Dict[str, List[str]] = {}
+        # location_updated coalescing: recipient -> (trip_id, sender) -> latest event
+        self.location_tick_ms = location_tick_ms
+        self._pending_locations: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+        self._location_task: Optional[asyncio.Task] = None
+        self.backplane = backplane or LocalBackplane()
+        self.backplane.subscribe(self._dispatch)
+        # Outgoing frames: one bounded outbox + writer task per socket
+        self.send_queue_size = send_queue_size
+        self.send_timeout_s = send_timeout_s
+        self.slow_consumer_timeout_s = slow_consumer_timeout_s
+        self._outboxes: Dict[WebSocket, _Outbox] = {}
+        self.counters = {"sent": 0, "dropped": 0, "evicted": 0, "pings": 0, "heartbeat_timeouts": 0}
+        # Heartbeat timer wheel: each socket sits in one slot and is visited once per
+        # revolution (heartbeat_interval), by a single task ticking every heartbeat_tick
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.heartbeat_tick = heartbeat_tick
+        self._wheel: List[Set[WebSocket]] = [set() for _ in range(max(1, round(heartbeat_interval / heartbeat_tick)))]
+        self._wheel_slot: Dict[WebSocket, int] = {}
+        self._wheel_cursor = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # Reconnect replay: every event to a user (except droppable frames) carries a
+        # per-user seq and is kept in a bounded log, replayed from ?last_seq=&stream=
+        self.replay_buffer_size = replay_buffer_size
+        self.replay_ttl_s = replay_ttl_s
+        self.replay_max_users = replay_max_users
+        self._replay: "OrderedDict[str, _ReplayLog]" = OrderedDict()
+        self._replay_streams = 0
+        self.counters.update({"replayed": 0, "resyncs": 0})
+        # Extension points (presence): user online/offline on this worker, extra backplane ops
+        self._connection_listeners: List[Callable[[str, bool], None]] = []
+        self._op_handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {}
+
+    def add_connection_listener(self, listener: Callable[[str, bool], None]):
+        """listener(user_id, online) runs when a user's first socket on this worker opens or the last one closes."""
+        self._connection_listeners.append(listener)
+
+    def register_op(self, op: str, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Handle backplane envelopes of another op (published with backplane.publish)."""
+        self._op_handlers[op] = handler
+
+    def _notify_connection(self, user_id: str, online: bool):
+        for listener in self._connection_listeners:
+            try:
+                listener(user_id, online)
+            except Exception as e:
+                logger.error(f"Error in connection listener: {e}")
+
+    def start(self):
+        """Start the location flush tick, the heartbeat wheel and the backplane (call from the app lifespan)."""
+        if self.location_tick_ms > 0 and self._location_task is None:
+            self._location_task = asyncio.create_task(self._location_loop())
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        self.backplane.start()
+
+    async def stop(self):
+        await self.backplane.stop()
+        for task in (self._location_task, self._heartbeat_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._location_task = self._heartbeat_task = None
+        await self.flush_locations()
 
     def _record_activity(self, websocket: WebSocket):
         self._connection_activity[websocket] = time.monotonic()
 
-    async def connect(self, websocket: WebSocket, user_id: str):
+    async def connect(
+        self, websocket: WebSocket, user_id: str, last_seq: Optional[int] = None, stream: Optional[str] = None
+    ):
+        """
+        Register the socket and send {"type": "hello", "stream", "seq"}. A client that
+        reconnects with the last seq and stream it saw first gets the missed events, or
+        {"type": "resync_required"} when they are no longer available (refetch over REST).
+        """
         await websocket.accept()
         self._record_activity(websocket)
         self._connection_user[websocket] = user_id
+        outbox = _Outbox(websocket, user_id)
+        outbox.task = asyncio.create_task(self._writer(outbox))
+        self._outboxes[websocket] = outbox
+        # Slot just behind the cursor: first visit one full interval from now
+        slot = (self._wheel_cursor - 1) % len(self._wheel)
+        self._wheel[slot].add(websocket)
+        self._wheel_slot[websocket] = slot
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
+            self._notify_connection(user_id, True)
         self.active_connections[user_id].append(websocket)
+        self._resume(websocket, user_id, last_seq, stream)
         logger.info(f"User {user_id} connected. Total connections for user: {len(self.active_connections[user_id])}")
 
+    def _replay_log(self, user_id: str, create: bool = False) -> Optional[_ReplayLog]:
+        log = self._replay.get(user_id)
+        if log is not None and log.expires_at is not None and log.expires_at <= time.monotonic():
+            del self._replay[user_id]
+            log = None
+        if log is None:
+            if not create or self.replay_buffer_size <= 0:
+                return None
+            self._replay_streams += 1
+            log = _ReplayLog(f"{self.backplane.worker_id}.{self._replay_streams}", self.replay_buffer_size)
+            self._replay[user_id] = log
+            while len(self._replay) > self.replay_max_users:
+                self._replay.popitem(last=False)
+        self._replay.move_to_end(user_id)
+        return log
+
+    def _resume(self, websocket: WebSocket, user_id: str, last_seq: Optional[int], stream: Optional[str]):
+        """Runs in the same step as the registration, so no live event can slip in before the replay."""
+        log = self._replay_log(user_id, create=True)
+        if log is None:
+            return
+        log.expires_at = None
+        self._enqueue(websocket, encode_frame({"type": "hello", "stream": log.stream, "seq": log.seq}))
+        if last_seq is None:
+            return
+        first_kept = log.frames[0][0] if log.frames else log.seq + 1
+        if stream != log.stream or last_seq > log.seq or last_seq + 1 < first_kept:
+            self.counters["resyncs"] += 1
+            self._enqueue(websocket, encode_frame({"type": "resync_required", "stream": log.stream, "seq": log.seq}))
+            return
+        for seq, frame in log.frames:
+            if seq > last_seq:
+                self.counters["replayed"] += 1
+                self._enqueue(websocket, frame)
+
     def disconnect(self, websocket: WebSocket, user_id: str):
+        outbox = self._outboxes.pop(websocket, None)
+        if outbox is not None:
+            # The flag also stops the writer if wait_for swallows the cancellation (Python < 3.12)
+            outbox.closed = True
+            outbox.ready.set()
+            if outbox.task is not None and outbox.task is not asyncio.current_task():
+                outbox.task.cancel()
+        slot = self._wheel_slot.pop(websocket, None)
+        if slot is not None:
+            self._wheel[slot].discard(websocket)
         self._connection_activity.pop(websocket, None)
         self._connection_user.pop(websocket, None)
         for room_id in self._connection_rooms.pop(websocket, set()):
@@ -48,23 +251,196 @@ class ConnectionManager:
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
                 logger.info(f"No more active connections for user {user_id}.")
+                log = self._replay.get(user_id)
+                if log is not None:
+                    log.expires_at = time.monotonic() + self.replay_ttl_s
+                self._notify_connection(user_id, False)
+
+    async def invalidate_friend_cache(self, user_id: str):
+        """Call when friendship is accepted or removed (for either user); applies to every worker."""
+        await self.backplane.publish({"op": "invalidate_friends", "user_id": user_id})
+
+    async def invalidate_trip(self, trip_id: str, left_user_id: Optional[str] = None, ended: bool = False):
+        """
+        Call after a trip's participants or status change; applies to every worker.
+        ended drops all live state of the trip, left_user_id that of a participant who left.
+        """
+        await self.backplane.publish({
+            "op": "invalidate_trip", "trip_id": trip_id, "left_user_id": left_user_id, "ended": ended,
+        })
+
+    async def invalidate_places(self, map_id: str):
+        """Call when a map's places change; applies to every worker."""
+        await self.backplane.publish({"op": "invalidate_places", "map_id": map_id})
+
+    async def share_trip_fix(
+        self, trip_id: str, user_id: str, position: Dict[str, Any], reference: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Call after this worker accepted and applied a participant's fixes: the other
+        workers apply the latest one to their live positions and proximity grid, and the
+        ingest filter's reference point (if any) to their filter. Proximity events are
+        only emitted by this worker.
+        """
+        await self.backplane.publish({
+            "op": "trip_fix",
+            "origin": self.backplane.worker_id,
+            "trip_id": trip_id,
+            "user_id": user_id,
+            "position": {
+                "latitude": position["latitude"],
+                "longitude": position["longitude"],
+                "accuracy": position["accuracy"],
+                "recorded_at": position["recorded_at"].isoformat(),
+            },
+            "reference": {**reference, "recorded_at": reference["recorded_at"].isoformat()} if reference else None,
+        })
+
+    async def _apply_trip_fix(self, envelope: Dict[str, Any]):
+        if envelope["origin"] == self.backplane.worker_id:
+            return
+        trip_id, user_id, position = envelope["trip_id"], envelope["user_id"], envelope["position"]
+        live_positions.update(trip_id, user_id, {
+            **position, "recorded_at": datetime.fromisoformat(position["recorded_at"])
+        })
+        reference = envelope["reference"]
+        if reference is not None:
+            location_filter.sync(trip_id, user_id, {
+                **reference, "recorded_at": datetime.fromisoformat(reference["recorded_at"])
+            })
+        if settings.proximity_enabled:
+            # Keeps this worker's grid complete; the events were sent by the origin
+            await proximity.update(trip_id, user_id, position["latitude"], position["longitude"])
+
+    def _invalidate_trip(self, trip_id: str, left_user_id: Optional[str], ended: bool):
+        roster_cache.invalidate(trip_id)
+        if ended:
+            live_positions.clear(trip_id)
+            location_filter.clear(trip_id)
+            proximity.clear(trip_id)
+        elif left_user_id is not None:
+            live_positions.remove_participant(trip_id, left_user_id)
+            location_filter.remove_participant(trip_id, left_user_id)
+            proximity.remove_participant(trip_id, left_user_id)
+
+    async def _dispatch(self, envelope: Dict[str, Any]):
+        """Deliver a backplane envelope to the sockets of this worker."""
+        op = envelope["op"]
+        if op == "users":
+            await self._deliver(envelope["user_ids"], envelope["message"])
+        elif op == "room":
+            await self._deliver_room(envelope["room_id"], envelope["message"])
+        elif op == "trip_event":
+            await self._deliver_trip_event(envelope["user_ids"], envelope["event_type"], envelope["data"])
+        elif op == "invalidate_friends":
+            friend_ids_cache.invalidate(envelope["user_id"])
+        elif op == "invalidate_trip":
+            self._invalidate_trip(envelope["trip_id"], envelope["left_user_id"], envelope["ended"])
+        elif op == "trip_fix":
+            await self._apply_trip_fix(envelope)
+        elif op == "invalidate_places":
+            proximity.invalidate_places(envelope["map_id"])
+        elif op in self._op_handlers:
+            await self._op_handlers[op](envelope)
+        else:
+            logger.warning(f"Unknown backplane op: {op}")
 
-    def invalidate_friend_cache(self, user_id: str):
-        """Call when friendship is accepted or removed (for either user)."""
-        self._friend_cache.pop(user_id, None)
+    def send_to_socket(self, websocket: WebSocket, message: Any):
+        """Queue a message for one socket; never waits on socket I/O."""
+        self._enqueue(websocket, encode_frame(message))
+
+    def _enqueue(self, websocket: WebSocket, frame: Frame):
+        outbox = self._outboxes.get(websocket)
+        if outbox is None:
+            return
+        queue = outbox.queue
+        if len(queue) >= self.send_queue_size:
+            now = time.monotonic()
+            if outbox.full_since is None:
+                outbox.full_since = now
+            victim = next((f for f in queue if f[0] in DROPPABLE_TYPES), None)
+            if victim is not None:
+                queue.remove(victim)
+            elif frame[0] not in DROPPABLE_TYPES:
+                # Would lose an event the client can't rebuild: let it reconnect instead
+                self._evict(outbox, "send queue full")
+                return
+            self.counters["dropped"] += 1
+            if now - outbox.full_since > self.slow_consumer_timeout_s:
+                self._evict(outbox, "send queue saturated")
+                return
+            if victim is None:
+                return
+        elif outbox.full_since is not None and len(queue) <= self.send_queue_size // 2:
+            outbox.full_since = None
+        queue.append(frame)
+        outbox.ready.set()
+
+    async def _writer(self, outbox: _Outbox):
+        websocket = outbox.websocket
+        try:
+            while not outbox.closed:
+                await outbox.ready.wait()
+                outbox.ready.clear()
+                while outbox.queue and not outbox.closed:
+                    _, text = outbox.queue.popleft()
+                    try:
+                        await asyncio.wait_for(websocket.send_text(text), self.send_timeout_s)
+                        self.counters["sent"] += 1
+                    except asyncio.TimeoutError:
+                        self._evict(outbox, "send timed out")
+                        return
+                    except Exception as e:
+                        logger.error(f"Error sending message to user {outbox.user_id}: {e}")
+                outbox.full_since = None
+        except asyncio.CancelledError:
+            pass
+
+    def _evict(self, outbox: _Outbox, reason: str):
+        """Disconnect a slow consumer; the client reconnects and refetches."""
+        logger.warning(f"Evicting slow WebSocket of user {outbox.user_id}: {reason}")
+        self.counters["evicted"] += 1
+        self.disconnect(outbox.websocket, outbox.user_id)
+        asyncio.create_task(self._close(outbox.websocket, code=1013))  # try again later
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int = 1000):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+    def _deliver_frame(self, user_id: str, frame: Frame):
+        """Sequence the frame for user_id (logged even while they are disconnected) and queue it."""
+        if frame[0] not in DROPPABLE_TYPES:
+            log = self._replay_log(user_id)
+            if log is not None:
+                log.seq += 1
+                frame = with_seq(frame, log.seq)
+                log.frames.append((log.seq, frame))
+        for connection in list(self.active_connections.get(user_id, [])):
+            self._enqueue(connection, frame)
+
+    def _send_local(self, message: Any, user_id: str):
+        if user_id in self.active_connections or user_id in self._replay:
+            self._deliver_frame(user_id, encode_frame(message))
+
+    async def _deliver(self, user_ids: List[str], message: Any):
+        """Encode once and share the text across the local sockets of user_ids (only seq differs)."""
+        frame = None
+        for user_id in user_ids:
+            if user_id not in self.active_connections and user_id not in self._replay:
+                continue
+            if frame is None:
+                frame = encode_frame(message)
+            self._deliver_frame(user_id, frame)
 
     async def send_personal_message(self, message: Any, user_id: str):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error sending message to user {user_id}: {e}")
+        await self.broadcast([user_id], message)
 
     async def broadcast(self, user_ids: List[str], message: Any):
-        tasks = [self.send_personal_message(message, user_id) for user_id in user_ids]
-        if tasks:
-            await asyncio.gather(*tasks)
+        if user_ids:
+            await self.backplane.publish({"op": "users", "user_ids": list(user_ids), "message": message})
 
     def join_room(self, room_id: str, websocket: WebSocket):
         if room_id not in self._rooms:
@@ -83,65 +459,125 @@ class ConnectionManager:
                 del self._rooms[room_id]
 
     async def broadcast_to_room(self, room_id: str, message: Any):
+        await self.backplane.publish({"op": "room", "room_id": room_id, "message": message})
+
+    async def _deliver_room(self, room_id: str, message: Any):
         sockets = self._rooms.get(room_id)
         if not sockets:
             return
+        frame = encode_frame(message)
         for ws in list(sockets):
-            try:
-                await ws.send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending to room {room_id}: {e}")
+            self._enqueue(ws, frame)
 
     async def broadcast_trip_event(self, participant_ids: List[str], event_type: str, data: Dict[str, Any]):
-        message = {"type": event_type, **data}
-        await self.broadcast(participant_ids, message)
+        await self.backplane.publish({
+            "op": "trip_event", "user_ids": list(participant_ids), "event_type": event_type, "data": data,
+        })
+
+    async def _deliver_trip_event(self, participant_ids: List[str], event_type: str, data: Dict[str, Any]):
+        if event_type == "location_updated" and self._location_task is not None:
+            self._queue_location(participant_ids, data)
+            return
+        await self._deliver(participant_ids, {"type": event_type, **data})
+
+    def _queue_location(self, participant_ids: List[str], data: Dict[str, Any]):
+        """Keep only the latest location_updated per (trip, sender) for each connected recipient."""
+        key = (data["trip_id"], data["user_id"])
+        for user_id in participant_ids:
+            if user_id not in self.active_connections:
+                continue
+            pending = self._pending_locations.setdefault(user_id, {})
+            previous = pending.get(key)
+            if previous is not None and previous["recorded_at"] > data["recorded_at"]:
+                continue
+            # Keep the intermediate points so clients can still draw the path
+            pending[key] = {**data, "points": self._points(previous) + self._points(data)} if previous else data
+
+    @staticmethod
+    def _points(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if "points" in data:
+            return data["points"]
+        return [{
+            "latitude": data["latitude"],
+            "longitude": data["longitude"],
+            "accuracy": data["accuracy"],
+            "recorded_at": data["recorded_at"],
+        }]
+
+    async def flush_locations(self):
+        """One frame per recipient: location_updated for a single update, else locations_batch."""
+        pending, self._pending_locations = self._pending_locations, {}
+        for user_id, updates in pending.items():
+            if len(updates) == 1:
+                message = {"type": "location_updated", **next(iter(updates.values()))}
+            else:
+                message = {"type": "locations_batch", "locations": list(updates.values())}
+            self._send_local(message, user_id)
+
+    async def _location_loop(self):
+        while True:
+            await asyncio.sleep(self.location_tick_ms / 1000)
+            try:
+                await self.flush_locations()
+            except Exception as e:
+                logger.error(f"Error flushing location updates: {e}")
 
     async def broadcast_to_friends(self, user_id: str, message: Any, db: Any):
-        friend_ids = self._friend_cache.get(user_id)
-        if friend_ids is None:
-            from sqlalchemy import select, or_, and_
-            from app.models.friendship import Friendship, FriendshipStatus
-            result = await db.execute(
-                select(Friendship)
-                .where(
-                    and_(
-                        Friendship.status == FriendshipStatus.ACCEPTED,
-                        or_(
-                            Friendship.requester_id == user_id,
-                            Friendship.addressee_id == user_id
-                        )
-                    )
-                )
-            )
-            friendships = result.scalars().all()
-            friend_ids = [f.addressee_id if f.requester_id == user_id else f.requester_id for f in friendships]
-            self._friend_cache[user_id] = friend_ids
+        friend_ids = await get_friend_ids(db, user_id)
         if friend_ids:
-            await self.broadcast(friend_ids, message)
+            await self.broadcast(list(friend_ids), message)
 
-    async def _heartbeat_loop(self, websocket: WebSocket, user_id: str):
-        """Send ping every HEARTBEAT_INTERVAL; close if no activity for HEARTBEAT_INTERVAL + HEARTBEAT_TIMEOUT."""
-        try:
-            while True:
-                await asyncio.sleep(HEARTBEAT_INTERVAL)
-                last = self._connection_activity.get(websocket)
-                if last is not None and (time.monotonic() - last) > (HEARTBEAT_INTERVAL + HEARTBEAT_TIMEOUT):
-                    logger.info(f"Heartbeat timeout for user {user_id}, closing connection")
-                    try:
-                        await websocket.close()
-                    except Exception:
-                        pass
-                    return
-                try:
-                    await websocket.send_json({"type": "ping"})
-                except Exception:
-                    return
-        except asyncio.CancelledError:
-            pass
+    def _heartbeat_sweep(self):
+        """
+        Visit the sockets of the current slot: ping the live ones, close those idle for
+        more than heartbeat_interval + heartbeat_timeout. Advances the cursor.
+        """
+        slot = self._wheel[self._wheel_cursor]
+        self._wheel_cursor = (self._wheel_cursor + 1) % len(self._wheel)
+        if not slot:
+            return
+        deadline = time.monotonic() - (self.heartbeat_interval + self.heartbeat_timeout)
+        for websocket in list(slot):
+            last = self._connection_activity.get(websocket)
+            user_id = self._connection_user.get(websocket)
+            if last is not None and last < deadline:
+                logger.info(f"Heartbeat timeout for user {user_id}, closing connection")
+                self.counters["heartbeat_timeouts"] += 1
+                self.disconnect(websocket, user_id)
+                asyncio.create_task(self._close(websocket))
+                continue
+            self.counters["pings"] += 1
+            self._enqueue(websocket, PING_FRAME)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_tick)
+            try:
+                self._heartbeat_sweep()
+            except Exception as e:
+                logger.error(f"Error in WebSocket heartbeat: {e}")
 
     def record_activity(self, websocket: WebSocket):
         """Call when any message is received from the client (e.g. pong or any other)."""
         self._record_activity(websocket)
 
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "connections": len(self._outboxes),
+            "queued": sum(len(outbox.queue) for outbox in self._outboxes.values()),
+            "saturated": sum(1 for outbox in self._outboxes.values() if outbox.full_since is not None),
+            "replay_logs": len(self._replay),
+        }
+
 
-manager = ConnectionManager()
+manager = ConnectionManager(
+    location_tick_ms=settings.ws_location_tick_ms,
+    backplane=create_backplane(),
+    send_queue_size=settings.ws_send_queue_size,
+    send_timeout_s=settings.ws_send_timeout_s,
+    slow_consumer_timeout_s=settings.ws_slow_consumer_timeout_s,
+    replay_buffer_size=settings.ws_replay_buffer_size,
+    replay_ttl_s=settings.ws_replay_ttl_s,
+    replay_max_users=settings.ws_replay_max_users,
+)
@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+from app.config import settings
+from app.database import async_session, create_tables
+from app.utils.location_archive import archive_ended_trips
+
+async def archive(older_than_days: int, batch_size: int):
+    # Creates the trip_location_archives table if it does not exist yet
+    await create_tables()
+
+    total_trips = total_rows = 0
+    async with async_session() as db:
+        while True:
+            archived = await archive_ended_trips(db, older_than_days, limit=batch_size)
+            if not archived:
+                break
+            for trip_id, count in archived.items():
+                print(f"{trip_id}: archived {count} locations")
+            total_trips += len(archived)
+            total_rows += sum(archived.values())
+
+    print(f"Archived {total_rows} locations from {total_trips} trips.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack the locations of ended trips into compressed archives")
+    parser.add_argument("--older-than-days", type=int, default=settings.location_archive_after_days)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(archive(args.older_than_days, args.batch_size))
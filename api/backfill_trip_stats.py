@@ -0,0 +1,31 @@
+import asyncio
+from sqlalchemy import select
+from app.database import async_session, create_tables
+from app.models import Trip, TripStats
+from app.utils.trip_stats import compute_trip_stats
+
+async def backfill_trip_stats():
+    # Creates the trip_stats table if it does not exist yet
+    await create_tables()
+
+    async with async_session() as db:
+        result = await db.execute(
+            select(Trip)
+            .outerjoin(TripStats, TripStats.trip_id == Trip.id)
+            .where(Trip.is_active == False, TripStats.trip_id.is_(None))
+        )
+        trips = result.scalars().all()
+        print(f"Computing stats for {len(trips)} ended trips...")
+
+        for trip in trips:
+            try:
+                stats = await compute_trip_stats(db, trip)
+                print(f"{trip.id}: {stats.point_count} points, {stats.total_distance_m:.0f} m")
+            except Exception as e:
+                await db.rollback()
+                print(f"{trip.id}: error {e}")
+
+    print("Trip stats backfill completed.")
+
+if __name__ == "__main__":
+    asyncio.run(backfill_trip_stats())
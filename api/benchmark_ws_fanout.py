@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+from starlette.websockets import WebSocket, WebSocketState
+from app.utils.websockets import ConnectionManager
+
+RECIPIENTS = [1000, 10000]
+ROUNDS = 5
+
+MESSAGE = {
+    "type": "trip_updated",
+    "trip_id": "4f1c2b8e-0d7a-4c55-9a61-2b7f0e6d9c13",
+    "map_id": "8a3e5d21-6b4f-4e2a-8c0d-1f9b7a6e5d42",
+    "title": "Volta da Lagoa da Pampulha",
+    "is_active": True,
+    "started_at": "2026-10-17T08:30:00",
+    "participants": [
+        {"user_id": f"user-{i}", "username": f"ciclista{i}", "status": "accepted", "joined_at": "2026-10-17T08:31:00"}
+        for i in range(12)
+    ],
+}
+
+
+async def _noop(*args, **kwargs):
+    pass
+
+
+async def _receive():
+    return {"type": "websocket.disconnect"}
+
+
+def make_socket(sent: list) -> WebSocket:
+    """Real starlette WebSocket over a no-op ASGI send, so send_json/send_text costs are the real ones."""
+    async def send(message):
+        sent.append(message)
+
+    websocket = WebSocket({"type": "websocket", "path": "/users/ws", "headers": []}, _receive, send)
+    websocket.client_state = WebSocketState.CONNECTED
+    websocket.application_state = WebSocketState.CONNECTED
+    return websocket
+
+
+async def per_socket_send_json(count: int) -> float:
+    """Previous path: send_json (and so json.dumps) once per recipient socket."""
+    sent = []
+    sockets = [make_socket(sent) for _ in range(count)]
+    start = time.perf_counter()
+    await asyncio.gather(*(ws.send_json(MESSAGE) for ws in sockets))
+    elapsed = time.perf_counter() - start
+    assert len(sent) == count
+    return elapsed
+
+
+async def shared_frame(count: int) -> float:
+    """Current path: ConnectionManager encodes once, writers send the shared text."""
+    sent = []
+    manager = ConnectionManager(send_queue_size=16)
+    user_ids = [f"user-{i}" for i in range(count)]
+    for user_id in user_ids:
+        ws = make_socket(sent)
+        ws.accept = _noop
+        await manager.connect(ws, user_id)
+
+    start = time.perf_counter()
+    await manager.broadcast(user_ids, MESSAGE)
+    while len(sent) < count:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    writers = [outbox.task for outbox in manager._outboxes.values()]
+    for ws, outbox in list(manager._outboxes.items()):
+        manager.disconnect(ws, outbox.user_id)
+    await asyncio.gather(*writers)
+    return elapsed
+
+
+async def benchmark_ws_fanout():
+    # connect/disconnect log every socket at INFO
+    logging.getLogger("app.utils.websockets").setLevel(logging.WARNING)
+    print(f"{'recipients':>10} {'send_json (ms)':>15} {'shared frame (ms)':>18} {'speedup':>8}")
+    for count in RECIPIENTS:
+        before = min([await per_socket_send_json(count) for _ in range(ROUNDS)])
+        after = min([await shared_frame(count) for _ in range(ROUNDS)])
+        print(f"{count:>10} {before * 1000:>15.1f} {after * 1000:>18.1f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(benchmark_ws_fanout())
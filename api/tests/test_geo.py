@@ -0,0 +1,63 @@
+"""
+Path simplification (ranked Douglas-Peucker) used by the trip previews and simplified paths.
+"""
+import numpy as np
+
+from app.utils.geo import simplify_indices
+
+# ~111 m per 0.001 degree of latitude
+STRAIGHT_LATS = [-19.9 + 0.001 * i for i in range(11)]
+STRAIGHT_LNGS = [-43.9] * 11
+
+
+def zigzag(n, amplitude):
+    """Northward path whose odd points deviate east by amplitude degrees."""
+    lats = [-19.9 + 0.001 * i for i in range(n)]
+    lngs = [-43.9 + (amplitude if i % 2 else 0.0) for i in range(n)]
+    return lats, lngs
+
+
+def corner():
+    """Five steps north, then five steps east: only the corner deviates."""
+    lats = [-19.9 + 0.001 * min(i, 5) for i in range(11)]
+    lngs = [-43.9 + 0.001 * max(i - 5, 0) for i in range(11)]
+    return lats, lngs
+
+
+def test_straight_path_keeps_only_the_endpoints():
+    indices = simplify_indices(STRAIGHT_LATS, STRAIGHT_LNGS, tolerance_m=1.0)
+    assert indices.tolist() == [0, 10]
+
+
+def test_tolerance_keeps_points_that_deviate_more():
+    lats, lngs = corner()
+    lats[8] += 0.00005  # ~5.6 m north of the eastward leg
+    assert simplify_indices(lats, lngs, tolerance_m=20.0).tolist() == [0, 5, 10]
+    assert simplify_indices(lats, lngs, tolerance_m=4.5).tolist() == [0, 5, 8, 10]
+
+
+def test_max_points_caps_the_result_and_keeps_endpoints():
+    lats, lngs = zigzag(51, 0.0005)
+    for max_points in (1, 2, 5, 20):
+        indices = simplify_indices(lats, lngs, max_points=max_points)
+        assert len(indices) == max(2, max_points)
+        assert indices[0] == 0 and indices[-1] == 50
+        assert np.all(np.diff(indices) > 0)
+
+
+def test_tolerance_stops_before_max_points():
+    lats, lngs = corner()
+    assert simplify_indices(lats, lngs, tolerance_m=1.0, max_points=8).tolist() == [0, 5, 10]
+
+
+def test_max_points_stops_before_tolerance():
+    lats, lngs = zigzag(21, 0.0005)
+    indices = simplify_indices(lats, lngs, tolerance_m=1.0, max_points=4)
+    assert len(indices) == 4 and indices[0] == 0 and indices[-1] == 20
+
+
+def test_short_or_unbounded_paths_are_returned_whole():
+    lats, lngs = zigzag(5, 0.0005)
+    assert simplify_indices(lats, lngs).tolist() == [0, 1, 2, 3, 4]
+    assert simplify_indices(lats, lngs, max_points=10).tolist() == [0, 1, 2, 3, 4]
+    assert simplify_indices(lats[:2], lngs[:2], tolerance_m=1000.0).tolist() == [0, 1]
@@ -0,0 +1,98 @@
+"""
+Location archive: the packed blob must decode back to the rows before they are deleted.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.utils.location_archive as location_archive_module
+from app.database import Base
+from app.models import Trip, TripLocation, TripLocationArchive
+from app.utils.location_archive import archive_trip, pack_locations, unpack_locations, verify_archive
+
+
+def row(i, user_id="u1"):
+    return {
+        "id": f"l{i:03d}",
+        "trip_id": "t1",
+        "user_id": user_id,
+        "latitude": -19.9 - i * 1e-4,
+        "longitude": -43.9 + i * 1e-4,
+        "accuracy": 5.0,
+        "recorded_at": datetime(2026, 1, 1, 8, i // 60, i % 60),
+    }
+
+
+def test_pack_unpack_round_trip():
+    rows = [row(i, user_id="u1" if i % 2 else "u2") for i in range(120)]
+    unpacked = unpack_locations("t1", pack_locations(rows))
+
+    assert [r["recorded_at"] for r in unpacked] == [r["recorded_at"] for r in rows]
+    assert [r["user_id"] for r in unpacked] == [r["user_id"] for r in rows]
+    assert [round(r["latitude"], 6) for r in unpacked] == [round(r["latitude"], 6) for r in rows]
+    assert unpacked[0]["id"] == "t1:0000000"
+
+
+def test_verify_archive_rejects_a_blob_missing_points():
+    rows = [row(i) for i in range(10)]
+    verify_archive("t1", rows, pack_locations(rows))
+    with pytest.raises(ValueError):
+        verify_archive("t1", rows, pack_locations(rows[:-1]))
+    with pytest.raises(ValueError):
+        verify_archive("t1", rows, pack_locations([{**r, "latitude": r["latitude"] + 0.01} for r in rows]))
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'archive.db'}")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+async def seed(db):
+    trip = Trip(
+        id="t1", name="Serra do Curral", map_id="m1", created_by="u1", is_active=False,
+        started_at=datetime(2026, 1, 1, 8), ended_at=datetime(2026, 1, 1, 9),
+    )
+    db.add(trip)
+    db.add_all(TripLocation(**row(i)) for i in range(10))
+    await db.commit()
+    return trip
+
+
+async def counts(db):
+    raw = await db.scalar(select(func.count()).select_from(TripLocation))
+    archives = await db.scalar(select(func.count()).select_from(TripLocationArchive))
+    return raw, archives
+
+
+def test_archive_trip_replaces_the_raw_rows(session_factory):
+    async def scenario():
+        async with session_factory() as db:
+            archived = await archive_trip(db, await seed(db))
+            return archived, await counts(db)
+
+    assert asyncio.run(scenario()) == (10, (0, 1))
+
+
+def test_codec_bug_keeps_the_raw_rows(session_factory, monkeypatch):
+    monkeypatch.setattr(location_archive_module, "pack_locations", lambda rows: pack_locations(rows[1:]))
+
+    async def scenario():
+        async with session_factory() as db:
+            trip = await seed(db)
+            with pytest.raises(ValueError):
+                await archive_trip(db, trip)
+            await db.rollback()
+            return await counts(db)
+
+    assert asyncio.run(scenario()) == (10, 0)
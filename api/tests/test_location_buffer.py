@@ -0,0 +1,157 @@
+"""
+LocationWriteBuffer failure handling, against a temporary SQLite database.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.utils.location_buffer as location_buffer_module
+from app.database import Base
+from app.models import TripLocation
+from app.utils.location_buffer import LocationWriteBuffer
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'telemetry.db'}")
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[TripLocation.__table__])
+
+    asyncio.run(create())
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(location_buffer_module, "telemetry_session", factory)
+    yield factory
+    asyncio.run(engine.dispose())
+
+
+def fix(i, latitude=-19.9):
+    return {
+        "trip_id": "t1", "user_id": "u1", "latitude": latitude, "longitude": -43.9,
+        "accuracy": 5.0, "recorded_at": datetime(2026, 1, 1, 0, 0, i),
+    }
+
+
+async def stored_count(factory):
+    async with factory() as db:
+        return await db.scalar(select(func.count()).select_from(TripLocation))
+
+
+def test_stop_keeps_the_batch_of_an_in_flight_flush(session_factory, monkeypatch):
+    async def scenario():
+        buffer = LocationWriteBuffer(flush_rows=1000, flush_interval=60, max_pending=100)
+        buffer.start()
+        write = buffer._write
+        started = asyncio.Event()
+
+        async def slow_write(rows, attempts):
+            started.set()
+            await asyncio.sleep(0.05)
+            return await write(rows, attempts)
+
+        monkeypatch.setattr(buffer, "_write", slow_write)
+        await buffer.enqueue([fix(i) for i in range(5)])
+        buffer._wakeup.set()
+        await started.wait()
+        await buffer.stop()
+        return await stored_count(session_factory), buffer.stats()
+
+    count, stats = asyncio.run(scenario())
+    assert count == 5
+    assert stats["queue_depth"] == 0 and stats["retry_batches"] == 0
+
+
+def test_cancelled_flush_requeues_its_rows(session_factory, monkeypatch):
+    async def scenario():
+        buffer = LocationWriteBuffer(flush_rows=1000, flush_interval=60, max_pending=100)
+
+        async def hanging_write(rows, attempts):
+            await asyncio.sleep(3600)
+
+        monkeypatch.setattr(buffer, "_write", hanging_write)
+        buffer._pending.extend(fix(i) for i in range(5))
+        task = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        monkeypatch.undo()
+        monkeypatch.setattr(location_buffer_module, "telemetry_session", session_factory)
+        await buffer.flush()
+        return await stored_count(session_factory)
+
+    assert asyncio.run(scenario()) == 5
+
+
+def test_rejected_rows_are_dropped_without_losing_the_rest(session_factory):
+    async def scenario():
+        buffer = LocationWriteBuffer(flush_rows=1000, flush_interval=60, max_pending=100)
+        await buffer.enqueue([fix(1), fix(2, latitude=None), fix(3)])
+        return await stored_count(session_factory), buffer.stats()
+
+    count, stats = asyncio.run(scenario())
+    assert count == 2
+    assert stats["dropped_rows"] == 1 and stats["retry_batches"] == 0
+
+
+class LockedSession:
+    async def __aenter__(self):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def test_database_outage_keeps_rows_and_applies_backpressure(session_factory, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(location_buffer_module, "telemetry_session", LockedSession)
+        buffer = LocationWriteBuffer(flush_rows=1000, flush_interval=60, max_pending=10, max_attempts=3)
+        buffer._task = object()  # queue without writing through
+        await buffer.enqueue([fix(i) for i in range(10)])
+        for _ in range(5):
+            await buffer.flush()
+        # Failed rows still count toward max_pending
+        blocked = asyncio.create_task(buffer.enqueue([fix(11)]))
+        await asyncio.sleep(0.01)
+        during = blocked.done(), buffer.stats()
+
+        monkeypatch.setattr(location_buffer_module, "telemetry_session", session_factory)
+        await buffer.flush()
+        await asyncio.wait_for(blocked, timeout=1)
+        await buffer.flush()
+        return during, await stored_count(session_factory), buffer.stats()
+
+    (blocked_done, during), count, after = asyncio.run(scenario())
+    assert not blocked_done
+    assert during["queue_depth"] == 10 and during["dropped_rows"] == 0
+    assert count == 11
+    assert after["queue_depth"] == 0 and after["dropped_rows"] == 0
+
+
+def test_unwritable_batch_is_dropped_after_max_attempts(session_factory, monkeypatch):
+    class BrokenSession:
+        async def __aenter__(self):
+            raise RuntimeError("cannot serialize row")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    async def scenario():
+        monkeypatch.setattr(location_buffer_module, "telemetry_session", BrokenSession)
+        buffer = LocationWriteBuffer(flush_rows=1000, flush_interval=60, max_pending=10, max_attempts=3)
+        buffer._task = object()
+        await buffer.enqueue([fix(i) for i in range(10)])
+        for _ in range(3):
+            await buffer.flush()
+        # The dropped batch no longer holds the queue at max_pending
+        await asyncio.wait_for(buffer.enqueue([fix(11)]), timeout=1)
+        return buffer.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["dropped_rows"] == 10
+    assert stats["retry_batches"] == 0 and stats["queue_depth"] == 1
@@ -0,0 +1,72 @@
+"""
+Round trips of the compact path encodings (the location archive stores the columnar one).
+"""
+from datetime import datetime
+
+import pytest
+
+from app.utils.location_codec import (
+    decode_columnar, decode_polyline, encode_columnar, encode_polyline, _HEADER
+)
+
+
+def test_polyline_matches_the_reference_example():
+    # From Google's encoded polyline documentation
+    lats, lngs = [38.5, 40.7, 43.252], [-120.2, -120.95, -126.453]
+    assert encode_polyline(lats, lngs) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_polyline_round_trip_with_negative_deltas():
+    lats = [-19.92345, -19.91, -19.93001, -19.93001, 0.0, -0.00001]
+    lngs = [-43.94567, -43.96, -43.90002, -43.95, 0.0, 0.00001]
+    decoded = decode_polyline(encode_polyline(lats, lngs))
+    assert decoded == [pytest.approx((la, lo), abs=1e-5) for la, lo in zip(lats, lngs)]
+    assert encode_polyline([], []) == "" and decode_polyline("") == []
+
+
+def row(user_id, second, latitude, longitude, accuracy=5.0):
+    return {
+        "user_id": user_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "accuracy": accuracy,
+        "recorded_at": datetime(2026, 1, 1, 8, 0, second),
+    }
+
+
+def test_columnar_round_trip():
+    rows = [
+        row("u1", 0, -19.923456, -43.945678),
+        row("u2", 1, -19.912345, -43.934567, accuracy=12.3),
+        row("u1", 2, -19.924001, -43.946002),
+        row("u2", 3, -19.911999, -43.933001, accuracy=0.0),
+    ]
+    decoded = decode_columnar(encode_columnar(rows))
+
+    expected = sorted(rows, key=lambda r: (r["user_id"], r["recorded_at"]))
+    assert len(decoded) == len(rows)
+    for got, want in zip(decoded, expected):
+        assert got["user_id"] == want["user_id"]
+        assert got["recorded_at"] == want["recorded_at"]
+        assert got["latitude"] == pytest.approx(want["latitude"], abs=1e-6)
+        assert got["longitude"] == pytest.approx(want["longitude"], abs=1e-6)
+        assert got["accuracy"] == pytest.approx(want["accuracy"], abs=0.05)
+
+
+def test_columnar_empty():
+    assert decode_columnar(encode_columnar([])) == []
+
+
+def test_columnar_falls_back_to_seconds_for_long_gaps():
+    # Consecutive rows (u1's last, u2's first) 60 days apart overflow int32 milliseconds
+    rows = [
+        row("u1", 0, -19.92, -43.94),
+        row("u1", 30, -19.93, -43.95),
+        {**row("u2", 15, -19.91, -43.93), "recorded_at": datetime(2026, 3, 2, 8, 0, 15)},
+    ]
+    data = encode_columnar(rows)
+    assert _HEADER.unpack_from(data, 0)[3] == 1000
+
+    decoded = decode_columnar(data)
+    assert [(r["user_id"], r["recorded_at"]) for r in decoded] == [(r["user_id"], r["recorded_at"]) for r in rows]
+    assert [r["latitude"] for r in decoded] == pytest.approx([r["latitude"] for r in rows], abs=1e-6)
@@ -0,0 +1,112 @@
+"""
+LocationIngestFilter: which fixes are dropped before they are stored or broadcast.
+"""
+from datetime import datetime, timedelta
+
+from app.utils.location_filter import LocationIngestFilter
+
+START = datetime(2026, 1, 1)
+# ~111 m per 0.001 degree of latitude
+STEP = 0.001
+
+
+def make_filter(**overrides):
+    options = dict(
+        min_distance_m=10.0,
+        min_interval_s=2.0,
+        keepalive_s=60.0,
+        max_accuracy_m=100.0,
+        smoothing=False,
+        process_noise_mps=3.0,
+    )
+    options.update(overrides)
+    return LocationIngestFilter(**options)
+
+
+def fix(seconds, north=0.0, accuracy=5.0):
+    return {
+        "latitude": -19.9 + north, "longitude": -43.9,
+        "accuracy": accuracy, "recorded_at": START + timedelta(seconds=seconds),
+    }
+
+
+def test_first_fix_is_kept():
+    f = make_filter()
+    assert f.apply("t1", "u1", [fix(0)]) == [fix(0)]
+    assert f.stats()["kept"] == 1 and f.stats()["tracked_participants"] == 1
+
+
+def test_inaccurate_fix_is_dropped():
+    f = make_filter()
+    assert f.apply("t1", "u1", [fix(0, accuracy=500.0)]) == []
+    assert f.counters["dropped_accuracy"] == 1
+    # 0 disables the accuracy limit
+    assert len(make_filter(max_accuracy_m=0).apply("t1", "u1", [fix(0, accuracy=500.0)])) == 1
+
+
+def test_fix_too_soon_after_the_last_is_dropped():
+    f = make_filter()
+    kept = f.apply("t1", "u1", [fix(0), fix(1, north=STEP), fix(3, north=STEP)])
+    assert [row["recorded_at"] for row in kept] == [fix(0)["recorded_at"], fix(3)["recorded_at"]]
+    assert f.counters["dropped_interval"] == 1
+
+
+def test_fix_that_barely_moved_is_dropped():
+    f = make_filter()
+    # ~5.5 m, under min_distance_m
+    assert len(f.apply("t1", "u1", [fix(0), fix(10, north=STEP / 20)])) == 1
+    assert f.counters["dropped_distance"] == 1
+
+
+def test_poor_accuracy_widens_the_distance_threshold():
+    f = make_filter()
+    # ~22 m moved, but the fix is only good to 60 m
+    assert len(f.apply("t1", "u1", [fix(0), fix(10, north=STEP / 5, accuracy=60.0)])) == 1
+    assert f.counters["dropped_distance"] == 1
+
+
+def test_stationary_participant_still_reports_after_keepalive():
+    f = make_filter()
+    kept = f.apply("t1", "u1", [fix(0), fix(30), fix(59), fix(61)])
+    assert [row["recorded_at"] for row in kept] == [fix(0)["recorded_at"], fix(61)["recorded_at"]]
+    assert f.counters["dropped_distance"] == 2
+
+
+def test_late_fix_is_kept_without_moving_the_reference():
+    f = make_filter()
+    f.apply("t1", "u1", [fix(100)])
+    assert len(f.apply("t1", "u1", [fix(50)])) == 1
+    assert f.reference("t1", "u1")["recorded_at"] == fix(100)["recorded_at"]
+    # Still measured against the newest fix
+    assert f.apply("t1", "u1", [fix(101, north=STEP)]) == []
+    assert f.counters["dropped_interval"] == 1
+
+
+def test_participants_and_trips_are_filtered_separately():
+    f = make_filter()
+    f.apply("t1", "u1", [fix(0)])
+    assert len(f.apply("t1", "u2", [fix(1)])) == 1
+    assert len(f.apply("t2", "u1", [fix(1)])) == 1
+    f.clear("t1")
+    assert f.reference("t1", "u1") is None and f.reference("t2", "u1") is not None
+
+
+def test_smoothing_pulls_a_jump_toward_the_last_fix():
+    f = make_filter(smoothing=True)
+    first, jump = fix(0, accuracy=5.0), fix(10, north=STEP, accuracy=50.0)
+    kept = f.apply("t1", "u1", [first, jump])
+    assert len(kept) == 2
+    assert first["latitude"] < kept[1]["latitude"] < -19.9 + STEP
+
+
+def test_sync_adopts_only_a_newer_reference():
+    f = make_filter()
+    f.apply("t1", "u1", [fix(10)])
+    other = make_filter()
+    other.apply("t1", "u1", [fix(5, north=STEP)])
+    f.sync("t1", "u1", other.reference("t1", "u1"))
+    assert f.reference("t1", "u1")["recorded_at"] == fix(10)["recorded_at"]
+    other.apply("t1", "u1", [fix(20, north=2 * STEP)])
+    f.sync("t1", "u1", other.reference("t1", "u1"))
+    assert f.reference("t1", "u1")["recorded_at"] == fix(20)["recorded_at"]
+    assert f.apply("t1", "u1", [fix(21, north=3 * STEP)]) == []
@@ -0,0 +1,59 @@
+"""
+Places endpoints against a temporary SQLite database.
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base, get_db
+from app.models.map import Map
+from app.models.user import User
+from app.routers import places
+from app.utils.dependencies import get_current_user
+from app.utils.websockets import manager
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'places.db'}")
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    owner = User(id="u1", email="ana@example.com", hashed_password="x")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with factory() as db:
+            db.add_all([User(id="u1", email="ana@example.com", hashed_password="x"),
+                        Map(id="m1", name="Bares de BH", created_by="u1")])
+            await db.commit()
+
+    asyncio.run(setup())
+
+    async def get_test_db():
+        async with factory() as db:
+            yield db
+
+    sent = []
+
+    async def broadcast(user_ids, message):
+        sent.append((sorted(user_ids), message))
+
+    monkeypatch.setattr(manager, "broadcast", broadcast)
+    app = FastAPI()
+    app.include_router(places.router)
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_current_user] = lambda: owner
+    yield TestClient(app), sent
+    asyncio.run(engine.dispose())
+
+
+def test_create_place_broadcasts_place_created(client):
+    client, sent = client
+    response = client.post("/places", json={"map_id": "m1", "name": "Mercado Central", "lat": -19.92, "lng": -43.94})
+
+    assert response.status_code == 201, response.text
+    place_id = response.json()["id"]
+    assert sent == [(["u1"], {"type": "place_created", "map_id": "m1", "place_id": place_id})]
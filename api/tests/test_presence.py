@@ -0,0 +1,61 @@
+"""
+PresenceService across workers, with a local backplane standing in for the others.
+"""
+import asyncio
+import time
+
+from app.utils.backplane import LocalBackplane
+from app.utils.presence import PresenceService
+from app.utils.websockets import ConnectionManager
+
+
+def make_presence(worker_id):
+    backplane = LocalBackplane()
+    backplane.worker_id = worker_id
+    manager = ConnectionManager(backplane=backplane)
+    announced = []
+
+    async def broadcast_to_friends(user_id, message, db):
+        announced.append(message)
+
+    manager.broadcast_to_friends = broadcast_to_friends
+    return PresenceService(manager, debounce_s=0.01, sync_s=60), announced
+
+
+async def remote_user_online(presence, worker_id, user_id):
+    await presence._on_envelope({
+        "op": "presence", "kind": "update", "worker_id": worker_id,
+        "user_id": user_id, "online": True, "at": 0,
+    })
+    await presence._on_envelope({
+        "op": "presence", "kind": "announced", "worker_id": worker_id, "user_id": user_id, "online": True,
+    })
+
+
+def test_expired_worker_users_are_announced_offline():
+    async def scenario():
+        presence, announced = make_presence("a")
+        await remote_user_online(presence, "dead", "u1")
+        presence._worker_seen["dead"] = 0  # missed its syncs
+        presence._expire_workers()
+        await asyncio.sleep(0.05)
+        return presence.is_online("u1"), announced
+
+    online, announced = asyncio.run(scenario())
+    assert not online
+    assert [(m["type"], m["user_id"], m["is_online"]) for m in announced] == [("presence_changed", "u1", False)]
+
+
+def test_only_one_surviving_worker_announces_an_expiry():
+    async def scenario():
+        presence, announced = make_presence("b")
+        await remote_user_online(presence, "dead", "u1")
+        presence._worker_seen["a"] = time.time()  # a live worker with a lower id
+        presence._worker_seen["dead"] = 0
+        presence._expire_workers()
+        await asyncio.sleep(0.05)
+        return presence.is_online("u1"), announced
+
+    online, announced = asyncio.run(scenario())
+    assert not online
+    assert announced == []
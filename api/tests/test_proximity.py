@@ -0,0 +1,88 @@
+"""
+ProximityTracker: nearby/separated and geofence events with hysteresis, over the per-trip grid.
+"""
+import asyncio
+
+from app.utils.proximity import ProximityTracker
+
+LAT, LNG = -19.9, -43.9
+# ~111 m per 0.001 degree of latitude
+STEP = 0.001
+
+
+def make_tracker(**overrides):
+    options = dict(
+        near_m=50.0, far_m=100.0,
+        geofence_enabled=False, geofence_radius_m=30.0, geofence_exit_m=60.0,
+    )
+    options.update(overrides)
+    return ProximityTracker(**options)
+
+
+def moves(tracker, *updates):
+    """Apply (user_id, metres north) updates in order; returns the event types of each."""
+    async def run():
+        return [
+            [event["type"] for event in await tracker.update("t1", user_id, LAT + STEP * north / 111, LNG)]
+            for user_id, north in updates
+        ]
+    return asyncio.run(run())
+
+
+def test_pair_becomes_nearby_and_separated_with_hysteresis():
+    tracker = make_tracker()
+    events = moves(
+        tracker,
+        ("u1", 0), ("u2", 80),  # apart
+        ("u2", 40),             # within near_m
+        ("u2", 40),             # already nearby
+        ("u2", 90),             # between near_m and far_m: still nearby
+        ("u2", 120),            # beyond far_m
+        ("u2", 90),             # not back within near_m
+    )
+    assert events == [[], [], ["participant_nearby"], [], [], ["participant_separated"], []]
+
+
+def test_only_neighbouring_cells_are_checked():
+    tracker = make_tracker()
+    # Cells are far_m wide: 1 km and 5 km away are never candidates
+    moves(tracker, ("u2", 1000), ("u3", 5000), ("u4", 60))
+    checks = tracker.counters["distance_checks"]
+    assert moves(tracker, ("u1", 0)) == [[]]
+    assert tracker.counters["distance_checks"] - checks == 1
+
+
+def test_nearby_pair_is_rechecked_after_leaving_the_neighbourhood():
+    tracker = make_tracker()
+    moves(tracker, ("u1", 0), ("u2", 10))
+    # The jump leaves the neighbouring cells, but the pair still has to be separated
+    assert moves(tracker, ("u2", 2000)) == [["participant_separated"]]
+    assert tracker.stats()["tracked_participants"] == 2
+
+
+def test_removed_participant_is_no_longer_compared():
+    tracker = make_tracker()
+    moves(tracker, ("u1", 0), ("u2", 10))
+    tracker.remove_participant("t1", "u2")
+    checks = tracker.counters["distance_checks"]
+    assert moves(tracker, ("u1", 5)) == [[]]
+    assert tracker.counters["distance_checks"] == checks
+
+
+def test_geofence_enter_and_exit_with_hysteresis(monkeypatch):
+    tracker = make_tracker(geofence_enabled=True)
+
+    async def load_places(trip_id, grid):
+        grid.places = {"p1": {"id": "p1", "name": "Praça", "lat": LAT + STEP, "lng": LNG}}
+        grid.place_cells = {grid.cell(LAT + STEP, LNG): {"p1"}}
+        grid.places_loaded = True
+
+    monkeypatch.setattr(tracker, "_load_places", load_places)
+    events = moves(
+        tracker,
+        ("u1", 0),    # ~111 m from the place
+        ("u1", 90),   # within geofence_radius_m
+        ("u1", 60),   # between radius and exit: still inside
+        ("u1", 30),   # beyond geofence_exit_m
+    )
+    assert events == [[], ["geofence_enter"], [], ["geofence_exit"]]
@@ -0,0 +1,99 @@
+"""
+EXPLAIN QUERY PLAN regression tests: the main queries of each router must be served
+by an index, never by a full table scan. Runs against an empty in-memory SQLite
+database built from the models (the indexes come from their __table_args__).
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from app.database import Base
+from app.models import Trip, TripParticipant
+from app.routers.chat import map_messages_query, trip_messages_query
+from app.routers.check_ins import place_check_ins_query
+from app.routers.friends import accepted_friendships_query, received_requests_query
+from app.routers.notifications import notifications_query
+from app.routers.social import feed_query
+from app.routers.trips import active_trips_query, participant_query, user_trip_history_queries
+from app.utils.location_archive import archives_query
+from app.utils.trip_locations import (
+    locations_query, path_stats_query, last_positions_query, encode_cursor
+)
+
+SINCE = datetime(2026, 1, 1)
+HISTORY = [stmt.limit(21) for stmt in user_trip_history_queries("u1", cursor=encode_cursor(SINCE, "t1"))]
+
+# Built with the same helpers the routers execute
+QUERIES = {
+    # trips
+    "trips.map_active_trips": active_trips_query("m1"),
+    "trips.participant": participant_query("t1", "u1"),
+    # emitted by selectinload(Trip.participants) for a page of trips
+    "trips.participants_selectin": select(TripParticipant).where(
+        TripParticipant.trip_id.in_(["t1", "t2"])
+    ),
+    "trips.user_history_participating": HISTORY[0],
+    "trips.user_history_created": HISTORY[1],
+    "trips.user_history_filtered": user_trip_history_queries("u1", status="ended", map_id="m1")[0],
+    "trips.user_history_page": select(Trip).where(Trip.id.in_(["t1", "t2"])),
+    "trips.locations": locations_query("t1"),
+    "trips.locations_filtered": locations_query("t1", since=SINCE, until=SINCE, user_id="u1"),
+    "trips.locations_cursor": locations_query("t1", cursor=encode_cursor(SINCE, "l1")).limit(1000),
+    "trips.path_stats": path_stats_query(["t1", "t2"]),
+    "trips.last_positions": last_positions_query(["t1", "t2"]),
+    "trips.archives": archives_query(["t1", "t2"]),
+    # notifications
+    "notifications.list": notifications_query("u1"),
+    # chat
+    "chat.map_messages": map_messages_query("m1", 50),
+    "chat.trip_messages": trip_messages_query("t1", 50),
+    # check-ins
+    "check_ins.place": place_check_ins_query("p1", 50),
+    # friends
+    "friends.list": accepted_friendships_query("u1"),
+    "friends.pending": received_requests_query("u1"),
+    # social
+    "social.feed_following": feed_query("following", "u1", ["u2"]).limit(50),
+    "social.feed_for_you": feed_query("for_you", "u1").limit(50),
+}
+
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+def query_plan(conn, stmt) -> list[str]:
+    sql = stmt.compile(
+        dialect=conn.dialect,
+        compile_kwargs={"literal_binds": True, "render_postcompile": True},
+    )
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    """Plan steps reading a whole table; index scans and subquery results are fine."""
+    return [
+        step for step in plan
+        if step.startswith("SCAN ")
+        and "INDEX" not in step
+        and not step.startswith(("SCAN anon_", "SCAN CONSTANT ROW"))
+    ]
+
+
+@pytest.mark.parametrize("name", sorted(QUERIES))
+def test_query_uses_an_index(conn, name):
+    plan = query_plan(conn, QUERIES[name])
+    assert not full_scans(plan), f"{name} falls back to a full scan:\n" + "\n".join(plan)
+
+
+@pytest.mark.parametrize("name", ["trips.user_history_participating", "trips.user_history_created"])
+def test_trip_history_pages_in_index_order(conn, name):
+    """A history page stops after limit rows: nothing may sort the user's whole history."""
+    plan = query_plan(conn, QUERIES[name])
+    assert not [step for step in plan if "TEMP B-TREE" in step], "\n".join(plan)
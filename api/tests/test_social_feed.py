@@ -0,0 +1,35 @@
+"""
+Social feed reads: trip cards use the stats stored at trip end and never compute them.
+"""
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import Trip, TripStats
+from app.routers.social import get_social_content_details
+
+
+def test_trip_without_stats_shows_null_stats_and_stays_uncomputed(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'feed.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as db:
+            db.add(Trip(
+                id="t1", name="Serra do Cipó", map_id="m1", created_by="u1", is_active=False,
+                started_at=datetime(2026, 1, 1, 8), ended_at=datetime(2026, 1, 1, 12),
+            ))
+            await db.commit()
+            card = await get_social_content_details(db, "trip", "t1")
+            stats_rows = await db.scalar(select(func.count()).select_from(TripStats))
+        await engine.dispose()
+        return card, stats_rows
+
+    card, stats_rows = asyncio.run(scenario())
+    assert card.total_distance_m is None and card.duration_seconds is None
+    assert card.locations == []
+    assert stats_rows == 0
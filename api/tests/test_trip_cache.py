@@ -0,0 +1,62 @@
+"""
+Active-trip caches: a load that races an invalidation must not store stale data.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.utils.trip_cache import TripRosterCache
+
+
+class SlowSession:
+    """Stands in for AsyncSession.execute: returns the trip once `release` is set."""
+
+    def __init__(self, trip):
+        self.trip = trip
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def execute(self, statement):
+        self.started.set()
+        await self.release.wait()
+        trip = self.trip
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(first=lambda: trip))
+
+
+def make_trip(status):
+    return SimpleNamespace(
+        id="t1", map_id="m1", created_by="u1", is_active=True,
+        participants=[SimpleNamespace(user_id="u2", status=status)],
+    )
+
+
+def test_roster_load_does_not_overwrite_an_invalidation():
+    async def scenario():
+        cache = TripRosterCache(max_trips=10, ttl_s=60)
+        db = SlowSession(make_trip("accepted"))
+        load = asyncio.create_task(cache.get(db, "t1"))
+        await db.started.wait()
+        cache.invalidate("t1")  # e.g. the participant left while the roster was loading
+        db.release.set()
+        stale = await load
+
+        fresh_db = SlowSession(make_trip("left"))
+        fresh_db.release.set()
+        return stale, await cache.get(fresh_db, "t1")
+
+    stale, fresh = asyncio.run(scenario())
+    assert stale.statuses == {"u2": "accepted"}
+    assert fresh.statuses == {"u2": "left"}
+
+
+def test_roster_cache_is_bounded():
+    async def scenario():
+        cache = TripRosterCache(max_trips=2, ttl_s=60)
+        for trip_id in ("t1", "t2", "t3"):
+            trip = make_trip("accepted")
+            trip.id = trip_id
+            db = SlowSession(trip)
+            db.release.set()
+            await cache.get(db, trip_id)
+        return cache.stats()
+
+    assert asyncio.run(scenario())["entries"] == 2
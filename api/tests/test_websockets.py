@@ -0,0 +1,189 @@
+"""
+ConnectionManager fan-out tests, over fake sockets that record the frames they are sent.
+"""
+import asyncio
+import json
+
+from app.utils.backplane import SqliteBackplane
+from app.utils.trip_cache import roster_cache
+from app.utils.websockets import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.frames.append(json.loads(text))
+
+    async def close(self, code=1000):
+        pass
+
+
+def location(trip_id, user_id, second):
+    return {
+        "trip_id": trip_id,
+        "user_id": user_id,
+        "latitude": -19.9 + second * 1e-4,
+        "longitude": -43.9,
+        "accuracy": 5.0,
+        "recorded_at": f"2026-01-01T00:00:{second:02d}+00:00",
+    }
+
+
+def test_coalesced_locations_are_the_same_for_every_recipient():
+    async def scenario():
+        manager = ConnectionManager(location_tick_ms=1000)
+        sockets = {user_id: FakeWebSocket() for user_id in ("u1", "u2", "u3")}
+        for user_id, ws in sockets.items():
+            await manager.connect(ws, user_id)
+        recipients = list(sockets)
+        manager._location_task = asyncio.create_task(asyncio.sleep(3600))  # queue instead of sending
+
+        for second in (1, 2, 3):
+            await manager.broadcast_trip_event(recipients, "location_updated", location("t1", "sender", second))
+            await manager.broadcast_trip_event(recipients, "location_updated", location("t1", "other", second))
+        manager._location_task.cancel()
+        manager._location_task = None
+        await manager.flush_locations()
+        await asyncio.sleep(0.05)  # let the writer tasks drain
+        for ws, user_id in list(manager._connection_user.items()):
+            manager.disconnect(ws, user_id)
+        return sockets
+
+    sockets = asyncio.run(scenario())
+    for ws in sockets.values():
+        batches = [frame for frame in ws.frames if frame["type"] == "locations_batch"]
+        assert len(batches) == 1
+        locations = {loc["user_id"]: loc for loc in batches[0]["locations"]}
+        assert set(locations) == {"sender", "other"}
+        for loc in locations.values():
+            assert [p["recorded_at"][-8:-6] for p in loc["points"]] == ["01", "02", "03"]
+            assert loc["recorded_at"].endswith(":03+00:00")
+
+
+def test_trip_invalidation_reaches_other_workers(tmp_path):
+    async def noop(envelope):
+        pass
+
+    async def scenario():
+        path = str(tmp_path / "backplane.db")
+        publisher = ConnectionManager(backplane=SqliteBackplane(path, poll_ms=10))
+        publisher.backplane.subscribe(noop)  # keep the publishing worker's own caches out of it
+        worker = ConnectionManager(backplane=SqliteBackplane(path, poll_ms=10))
+        worker.backplane.start()
+        roster_cache._rosters.set("trip-remote", object())
+
+        await publisher.invalidate_trip("trip-remote", ended=True)
+        for _ in range(100):
+            if roster_cache._rosters.get("trip-remote") is None:
+                break
+            await asyncio.sleep(0.01)
+        await worker.backplane.stop()
+        return roster_cache._rosters.get("trip-remote")
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_failing_backplane_envelope_does_not_skip_the_batch(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "backplane.db")
+        publisher = SqliteBackplane(path, poll_ms=10)
+        worker = SqliteBackplane(path, poll_ms=10)
+        handled = []
+
+        async def handler(envelope):
+            if envelope["n"] == 1:
+                raise ValueError("bad envelope")
+            handled.append(envelope["n"])
+
+        worker.subscribe(handler)
+        for n in range(3):
+            await publisher.publish({"op": "test", "n": n})
+        worker.start()
+        for _ in range(100):
+            if len(handled) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        return handled, worker.stats()
+
+    handled, stats = asyncio.run(scenario())
+    assert handled == [0, 2]
+    assert stats["failed"] == 1
+
+
+def test_failed_location_frame_gets_an_error_and_keeps_the_socket(monkeypatch):
+    import app.utils.security as security
+    import app.utils.trip_locations as trip_locations
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.routers import users
+
+    calls = []
+
+    async def ingest(user_id, msg):
+        calls.append(msg["ref"])
+        if msg["ref"] == 1:
+            raise RuntimeError("database is locked")
+        return {"type": "location_ack", "trip_id": msg["trip_id"], "ref": msg["ref"], "count": 1, "dropped": 0}
+
+    monkeypatch.setattr(security, "verify_access_token", lambda token: "u1")
+    monkeypatch.setattr(trip_locations, "ingest_location_frame", ingest)
+    app = FastAPI()
+    app.include_router(users.router)
+
+    with TestClient(app).websocket_connect("/users/ws?token=t") as ws:
+        assert ws.receive_json()["type"] == "hello"
+        ws.send_json({"type": "trip_location", "trip_id": "t1", "ref": 1})
+        error = ws.receive_json()
+        ws.send_json({"type": "trip_location", "trip_id": "t1", "ref": 2})
+        ack = ws.receive_json()
+
+    assert error == {"type": "location_error", "trip_id": "t1", "ref": 1, "detail": "Could not record locations"}
+    assert ack["type"] == "location_ack" and ack["ref"] == 2
+    assert calls == [1, 2]
+
+
+def test_accepted_fixes_reach_other_workers(tmp_path, monkeypatch):
+    from datetime import datetime, timezone
+    from app.config import settings
+    from app.utils.location_filter import location_filter
+    from app.utils.proximity import proximity
+    from app.utils.trip_cache import live_positions
+
+    async def noop(envelope):
+        pass
+
+    monkeypatch.setattr(settings, "proximity_enabled", True)
+    monkeypatch.setattr(proximity, "geofence_enabled", False)
+    recorded_at = datetime(2026, 1, 1, 8, 0, 5, tzinfo=timezone.utc)
+    fix = {"latitude": -19.92, "longitude": -43.94, "accuracy": 5.0, "recorded_at": recorded_at}
+    reference = {"latitude": -19.92, "longitude": -43.94, "recorded_at": recorded_at, "variance": 25.0}
+
+    async def scenario():
+        path = str(tmp_path / "backplane.db")
+        publisher = ConnectionManager(backplane=SqliteBackplane(path, poll_ms=10))
+        publisher.backplane.subscribe(noop)
+        worker = ConnectionManager(backplane=SqliteBackplane(path, poll_ms=10))
+        worker.backplane.start()
+        live_positions._positions.set("trip-fix", {})
+
+        await publisher.share_trip_fix("trip-fix", "u1", fix, reference)
+        for _ in range(100):
+            if live_positions._positions.get("trip-fix"):
+                break
+            await asyncio.sleep(0.01)
+        await worker.backplane.stop()
+        return await live_positions.get(None, "trip-fix")
+
+    positions = asyncio.run(scenario())
+    assert [(p["user_id"], p["latitude"]) for p in positions] == [("u1", -19.92)]
+    assert location_filter.reference("trip-fix", "u1") == reference
+    assert proximity._trips["trip-fix"].positions["u1"][:2] == (-19.92, -43.94)
+    location_filter.clear("trip-fix")
+    proximity.clear("trip-fix")
+    live_positions.clear("trip-fix")